@@ -0,0 +1,69 @@
+"""Throughput of the BibTex and Medline exporters
+
+Run with asv or directly, e.g. `python -m benchmarks.bench_export`.
+"""
+
+# License: BSD (3-clause)
+
+import os.path as op
+
+from pymed.utils import _TempDir
+
+from .common import SIZES, make_records, run
+
+
+class TimeExport(object):
+    params = (SIZES, [1, 4])
+    param_names = ['n_records', 'n_jobs']
+
+    def setup(self, n_records, n_jobs):
+        self.recs = make_records(n_records)
+        self.tempdir = _TempDir()
+
+    def teardown(self, n_records, n_jobs):
+        self.tempdir.cleanup()
+
+    def time_save_as_bibtex(self, n_records, n_jobs):
+        self.recs.save_as_bibtex(op.join(self.tempdir, 'recs.bib'),
+                                 n_jobs=n_jobs)
+
+    def time_save_as_nbib(self, n_records, n_jobs):
+        self.recs.save_as_nbib(op.join(self.tempdir, 'recs.nbib'),
+                               n_jobs=n_jobs)
+
+    def peakmem_save_as_bibtex(self, n_records, n_jobs):
+        self.recs.save_as_bibtex(op.join(self.tempdir, 'recs.bib'),
+                                 n_jobs=n_jobs)
+
+    def peakmem_save_as_nbib(self, n_records, n_jobs):
+        self.recs.save_as_nbib(op.join(self.tempdir, 'recs.nbib'),
+                               n_jobs=n_jobs)
+
+
+class TimeFormat(object):
+    params = SIZES
+    param_names = ['n_records']
+
+    def setup(self, n_records):
+        self.recs = make_records(n_records)
+
+    def time_to_bibtex(self, n_records):
+        for rec in self.recs:
+            rec.to_bibtex()
+
+    def peakmem_to_bibtex(self, n_records):
+        for rec in self.recs:
+            rec.to_bibtex()
+
+    def time_to_nbib(self, n_records):
+        for rec in self.recs:
+            rec.to_nbib()
+
+    def peakmem_to_nbib(self, n_records):
+        for rec in self.recs:
+            rec.to_nbib()
+
+
+if __name__ == '__main__':
+    run(TimeExport)
+    run(TimeFormat)
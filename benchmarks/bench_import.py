@@ -0,0 +1,47 @@
+"""Startup time of short-lived processes using pymed
+
+Each benchmark runs in a fresh interpreter. Run with asv or directly,
+e.g. `python -m benchmarks.bench_import`, which on Python 3.7+ also
+prints the slowest modules reported by `python -X importtime`.
+"""
+
+# License: BSD (3-clause)
+
+import os.path as op
+import subprocess
+import sys
+
+from .common import run
+
+FNAME = op.join(op.dirname(op.dirname(op.abspath(__file__))), 'pymed',
+                'tests', 'test_recs.json')
+
+
+class ImportSuite(object):
+
+    def timeraw_import_pymed(self):
+        return 'import pymed'
+
+    def timeraw_read_records(self):
+        return 'import pymed\npymed.read_records(%r)' % FNAME
+
+    def timeraw_import_entrez(self):
+        # the cost deferred to the first download
+        return 'from Bio import Entrez, Medline'
+
+
+def importtime(n_max=10):
+    """Print the modules with the largest cumulative import time"""
+    out = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                            'import pymed'], stderr=subprocess.PIPE)
+    lines = out.communicate()[1].decode().splitlines()[1:]
+    rows = [line.split('|') for line in lines if line.count('|') == 2]
+    rows.sort(key=lambda row: int(row[1]), reverse=True)
+    for _, cumulative, name in rows[:n_max]:
+        print('%8.1f ms %s' % (int(cumulative) / 1e3, name.rstrip()))
+
+
+if __name__ == '__main__':
+    run(ImportSuite)
+    if sys.version_info >= (3, 7):
+        importtime()
@@ -0,0 +1,58 @@
+"""Reading and writing records in json and parsing Medline text
+
+Run with asv or directly, e.g. `python -m benchmarks.bench_io`.
+"""
+
+# License: BSD (3-clause)
+
+import io
+import os.path as op
+
+from Bio import Medline
+
+from pymed import read_records
+from pymed.pymed import write_records
+from pymed.utils import _TempDir
+
+from .common import SIZES, make_records, run, write_medline
+
+
+class IOSuite(object):
+    params = SIZES
+    param_names = ['n_records']
+
+    def setup(self, n_records):
+        self.tempdir = _TempDir()
+        self.recs = make_records(n_records)
+        self.fname_json = op.join(self.tempdir, 'recs.json')
+        self.fname_medline = op.join(self.tempdir, 'recs.txt')
+        write_records(self.recs, self.fname_json)
+        write_medline(self.recs, self.fname_medline)
+
+    def teardown(self, n_records):
+        self.tempdir.cleanup()
+
+    def time_read_records(self, n_records):
+        read_records(self.fname_json)
+
+    def peakmem_read_records(self, n_records):
+        read_records(self.fname_json)
+
+    def time_write_records(self, n_records):
+        write_records(self.recs, op.join(self.tempdir, 'out.json'))
+
+    def peakmem_write_records(self, n_records):
+        write_records(self.recs, op.join(self.tempdir, 'out.json'))
+
+    def time_parse_medline(self, n_records):
+        with io.open(self.fname_medline, encoding='utf-8') as fid:
+            for rec in Medline.parse(fid):
+                pass
+
+    def peakmem_parse_medline(self, n_records):
+        with io.open(self.fname_medline, encoding='utf-8') as fid:
+            list(Medline.parse(fid))
+
+
+if __name__ == '__main__':
+    run(IOSuite)
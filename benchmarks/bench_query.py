@@ -0,0 +1,97 @@
+"""Downloading records with query_records without network access
+
+QuerySuite replaces the E-utilities requests with prepared responses and
+skips the NCBI rate limit, hence only Medline parsing and the assembly of
+records are measured.
+NetworkQuerySuite goes through HTTP, answered by a local FakeEntrezServer
+with simulated latency and server errors.
+
+Run with asv or directly, e.g. `python -m benchmarks.bench_query`.
+"""
+
+# License: BSD (3-clause)
+
+import io
+import json
+
+from Bio import Entrez
+
+from pymed import query_records
+from pymed import pymed as _pymed
+from pymed.metrics import QueryMetrics
+from pymed.testing import FakeEntrezServer
+
+from .common import SIZES, make_records, run, to_medline
+
+
+class _FakeEutils(object):
+    """Serve esearch and efetch from prepared records"""
+
+    def __init__(self, records):
+        self.texts = [to_medline(rec) for rec in records]
+
+    def __call__(self, utility, **params):
+        if utility == 'esearch':
+            return io.BytesIO(json.dumps(
+                {'Count': str(len(self.texts)), 'WebEnv': 'WEBENV_1',
+                 'QueryKey': '1'}).encode())
+        start = int(params['retstart'])
+        text = '\n'.join(self.texts[start:start + int(params['retmax'])])
+        return io.BytesIO(text.encode('utf-8'))
+
+
+def _read_json(handle):
+    return json.loads(handle.read().decode())
+
+
+def _no_wait():
+    return 0.
+
+
+class QuerySuite(object):
+    params = (SIZES, [50, 500])
+    param_names = ['n_records', 'chunksize']
+
+    def setup(self, n_records, chunksize):
+        self.saved = (_pymed._open_eutils, _pymed._wait_for_eutils,
+                      Entrez.read)
+        _pymed._open_eutils = _FakeEutils(make_records(n_records))
+        _pymed._wait_for_eutils = _no_wait
+        Entrez.read = _read_json
+
+    def teardown(self, n_records, chunksize):
+        (_pymed._open_eutils, _pymed._wait_for_eutils,
+         Entrez.read) = self.saved
+
+    def time_query_records(self, n_records, chunksize):
+        query_records('diffusion', 'nobody@example.com', chunksize=chunksize)
+
+    def time_query_records_metrics(self, n_records, chunksize):
+        query_records('diffusion', 'nobody@example.com', chunksize=chunksize,
+                      callback=QueryMetrics())
+
+    def peakmem_query_records(self, n_records, chunksize):
+        query_records('diffusion', 'nobody@example.com', chunksize=chunksize)
+
+
+class NetworkQuerySuite(object):
+    params = (SIZES, [0., 0.05], [0., 0.1])
+    param_names = ['n_records', 'latency', 'error_rate']
+    timeout = 600
+
+    def setup(self, n_records, latency, error_rate):
+        self.server = FakeEntrezServer(make_records(n_records),
+                                       latency=latency,
+                                       error_rate=error_rate).__enter__()
+
+    def teardown(self, n_records, latency, error_rate):
+        self.server.__exit__()
+
+    def time_query_records(self, n_records, latency, error_rate):
+        query_records('diffusion', 'nobody@example.com', chunksize=500,
+                      sleep_between_tries=0)
+
+
+if __name__ == '__main__':
+    run(QuerySuite)
+    run(NetworkQuerySuite)
@@ -0,0 +1,63 @@
+"""Selecting, dropping, copying and displaying records
+
+Run with asv or directly, e.g. `python -m benchmarks.bench_records`.
+"""
+
+# License: BSD (3-clause)
+
+from pymed import Records
+
+from .common import SIZES, make_records, run
+
+
+class RecordsSuite(object):
+    params = SIZES
+    param_names = ['n_records']
+
+    def setup(self, n_records):
+        self.recs = make_records(n_records)
+        self.exclude = list(range(0, n_records, 3))
+
+    def time_find(self, n_records):
+        self.recs.find('amyloid plaque')
+
+    def peakmem_find(self, n_records):
+        self.recs.find('amyloid plaque')
+
+    def time_match(self, n_records):
+        for rec in self.recs:
+            rec.match('Alzheimer')
+
+    def peakmem_match(self, n_records):
+        for rec in self.recs:
+            rec.match('Alzheimer')
+
+    def time_init(self, n_records):
+        Records(self.recs)
+
+    def time_exclude_drop(self, n_records):
+        # includes building the collection, drop works in-place
+        recs = Records(self.recs)
+        recs.exclude_ = self.exclude
+        recs.drop()
+
+    def peakmem_exclude_drop(self, n_records):
+        recs = Records(self.recs)
+        recs.exclude_ = self.exclude
+        recs.drop()
+
+    def time_copy(self, n_records):
+        self.recs.copy()
+
+    def peakmem_copy(self, n_records):
+        self.recs.copy()
+
+    def time_repr(self, n_records):
+        repr(self.recs)
+
+    def peakmem_repr(self, n_records):
+        repr(self.recs)
+
+
+if __name__ == '__main__':
+    run(RecordsSuite)
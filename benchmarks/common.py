@@ -0,0 +1,152 @@
+"""Synthetic corpora and a minimal runner for the benchmarks"""
+
+# License: BSD (3-clause)
+
+import io
+import itertools
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+try:
+    from queue import Empty
+except ImportError:  # Python 2
+    from Queue import Empty
+
+from pymed import PubmedRecord, Records
+from pymed.testing import _to_medline as to_medline
+
+# corpus sizes, e.g. PYMED_BENCH_SIZES=10000,1000000,5000000
+SIZES = [int(n) for n in
+         os.environ.get('PYMED_BENCH_SIZES', '10000').split(',')]
+
+WORDS = ('brain diffusion kurtosis imaging white matter tract mouse model '
+         'amyloid plaque alzheimer disease cortex neuron signal tensor '
+         'microstructure study patients children statistical analysis '
+         'magnetic resonance clinical cohort increased reduced').split()
+JOURNALS = [('Magnetic resonance in medicine', 'Magn Reson Med'),
+            ('NeuroImage', 'Neuroimage'),
+            ('Radiology', 'Radiology'),
+            ('Brain research', 'Brain Res')]
+MESH = ['Brain/pathology', 'Animals', 'Mice', 'Humans', 'Alzheimer Disease',
+        'Diffusion Magnetic Resonance Imaging/*methods', 'White Matter']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep',
+          'Oct', 'Nov', 'Dec']
+
+
+def make_record(pmid, rng):
+    """Create a random record resembling a Medline record"""
+    year = rng.randint(1990, 2013)
+    month = rng.randint(1, 12)
+    journal, abbrev = rng.choice(JOURNALS)
+    authors = ['%s %s' % (rng.choice(WORDS).capitalize(),
+                          ''.join(rng.choice('ABCDEFGHJKLMNPRS')
+                                  for _ in range(rng.randint(1, 2))))
+               for _ in range(rng.randint(1, 8))]
+    doi = '10.%i/%s.%i' % (rng.randint(1000, 9999), abbrev.lower()[:4], pmid)
+    return PubmedRecord({
+        'PMID': str(pmid),
+        'TI': ' '.join(rng.choice(WORDS) for _ in range(12)).capitalize(),
+        'AB': ' '.join(rng.choice(WORDS) for _ in range(200)),
+        'AU': authors,
+        'FAU': authors,
+        'DP': '%i %s %i' % (year, MONTHS[month - 1], rng.randint(1, 28)),
+        'EDAT': '%i/%02i/01 06:00' % (year, month),
+        'DA': '%i%02i01' % (year, month),
+        'JT': journal,
+        'TA': abbrev,
+        'PT': ['Journal Article'],
+        'MH': rng.sample(MESH, 3),
+        'PG': '%i-%i' % (month, month + 10),
+        'VI': str(rng.randint(1, 300)),
+        'IP': str(rng.randint(1, 12)),
+        'AID': ['%s [doi]' % doi],
+        'SO': '%s. %i;%i' % (abbrev, year, month),
+    })
+
+
+def make_records(n_records, seed=0):
+    """Create a collection of random records"""
+    rng = random.Random(seed)
+    return Records(make_record(pmid, rng)
+                   for pmid in range(1000000, 1000000 + n_records))
+
+
+def write_medline(records, fname):
+    """Write records to a Medline text file"""
+    with io.open(fname, 'w', encoding='utf-8') as fid:
+        for rec in records:
+            text = to_medline(rec) + '\n'
+            fid.write(text if isinstance(text, type(u'')) else
+                      text.decode('utf-8'))
+
+
+def _peakmem(bench, name, params, queue):
+    """Aux Function: run a benchmark in a child and report its peak RSS"""
+    try:
+        bench.setup(*params)
+        start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        getattr(bench, name)(*params)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if hasattr(bench, 'teardown'):
+            bench.teardown(*params)
+    except Exception as err:
+        queue.put((None, '%s: %s' % (type(err).__name__, err)))
+    else:
+        queue.put((peak - start, None))
+
+
+def _get_peakmem(proc, queue):
+    """Aux Function: wait for the result of a child, None if it died"""
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            if not proc.is_alive():
+                return None, 'exit code %s' % proc.exitcode
+
+
+def run(cls):
+    """Run the time_, timeraw_ and peakmem_ benchmarks of a class
+
+    Peak memory is measured in a child process, as the increase of its
+    maximum resident set size while running the benchmark. The code
+    returned by timeraw_ benchmarks is timed in a fresh interpreter.
+    """
+    names = sorted(n for n in dir(cls)
+                   if n.startswith(('time_', 'timeraw_', 'peakmem_')))
+    params = getattr(cls, 'params', ())
+    if params and not isinstance(params[0], (list, tuple)):
+        params = (params,)
+    param_names = getattr(cls, 'param_names', [])
+    for combination in itertools.product(*params):
+        label = ', '.join('%s=%s' % p for p in zip(param_names, combination))
+        for name in names:
+            bench = cls()
+            if name.startswith('time_'):
+                bench.setup(*combination)
+                t0 = time.time()
+                getattr(bench, name)(*combination)
+                result = '%.3f s' % (time.time() - t0)
+                if hasattr(bench, 'teardown'):
+                    bench.teardown(*combination)
+            elif name.startswith('timeraw_'):
+                code = getattr(bench, name)(*combination)
+                out = subprocess.check_output([sys.executable, '-c', (
+                    'import timeit\nt0 = timeit.default_timer()\n%s\n'
+                    'print(timeit.default_timer() - t0)' % code)])
+                result = '%.3f s' % float(out.decode().split()[-1])
+            else:
+                queue = multiprocessing.Queue()
+                proc = multiprocessing.Process(
+                    target=_peakmem, args=(bench, name, combination, queue))
+                proc.start()
+                peak, error = _get_peakmem(proc, queue)
+                proc.join()
+                result = ('failed (%s)' % error if error is not None else
+                          '%.1f MB' % (peak / 1024.))
+            print('%s.%s (%s): %s' % (cls.__name__, name, label, result))
@@ -1,4 +1,7 @@
 from .pymed import PubmedRecord, Records, query_records, read_records
+from .pubmed_xml import read_pubmed_xml, iter_pubmed_xml
+from .profiling import profile
 
 __version__ = '0.1.git'
-__all__ = ['Records', 'PubmedRecord','query_records', 'read_records']
+__all__ = ['Records', 'PubmedRecord','query_records', 'read_records',
+           'read_pubmed_xml', 'iter_pubmed_xml', 'profile']
@@ -14,6 +14,12 @@ PMD = Bunch()
 
 PMD.PT_ARTICLE      = 'journal article'
 PMD.DEF_FIELDS      = ['TI', 'AU', 'DP', 'AB', 'JT', 'TA', 'PT', 'MH', 'PMID']
+PMD.DATE_FIELDS     = ['DP', 'EDAT', 'DA', 'LR', 'DEP']
+PMD.LINK_TAGS       = ['CON', 'CIN', 'EIN', 'EFR', 'CRI', 'CRF', 'PRIN',
+                       'PROF', 'RPI', 'RPF', 'RIN', 'ROF', 'UIN', 'UOF',
+                       'SPIN', 'ORI']
+PMD.VERSION_TAGS    = ['EIN', 'EFR', 'CRI', 'CRF', 'PRIN', 'PROF', 'RPI',
+                       'RPF', 'RIN', 'ROF', 'UIN', 'UOF']
 PMD.SEP_PAGES_ENTRY = ';'
 PMD.AGES_RANGE      = '-'
 PMD.AB              = 'Abstract'
@@ -0,0 +1,190 @@
+"""Near-duplicate detection with MinHash and locality sensitive hashing"""
+
+# License: BSD (3-clause)
+
+import zlib
+
+import numpy as np
+
+from .constants import PMD
+from .features import TOKEN_REGEX, _get_text
+from .links import get_linked_pmids
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _get_shingles(text, shingle_size):
+    """Aux Function: hash the word n-grams of a text to 32 bit integers
+
+    Texts shorter than a shingle, e.g. boilerplate titles such as
+    'Erratum.', have no shingles and are not compared.
+    """
+    tokens = TOKEN_REGEX.findall(text.lower())
+    n_grams = max(len(tokens) - shingle_size + 1, 0)
+    grams = set(' '.join(tokens[ii:ii + shingle_size])
+                for ii in range(n_grams))
+    return np.array([zlib.crc32(g.encode('utf-8')) & 0xffffffff
+                     for g in grams], dtype=np.uint64)
+
+
+def _minhash(shingles, a, b):
+    """Aux Function: the MinHash signature of a set of shingles
+
+    Each permutation is simulated by a hash function (a * x + b) mod p.
+    """
+    hashes = (np.outer(a, shingles) + b[:, np.newaxis]) % MERSENNE_PRIME
+    return (hashes & MAX_HASH).min(axis=1)
+
+
+def _false_rates(threshold, n_bands, n_rows):
+    """Aux Function: false positive and negative probabilities of banding"""
+    sim = np.linspace(0, 1, 101)
+    prob = 1. - (1. - sim ** n_rows) ** n_bands
+    fp = np.mean(np.where(sim < threshold, prob, 0))
+    fn = np.mean(np.where(sim >= threshold, 1. - prob, 0))
+    return fp, fn
+
+
+def _get_bands(threshold, num_perm):
+    """Aux Function: choose number of bands and rows closest to threshold"""
+    best, best_err = (1, num_perm), np.inf
+    for n_bands in range(1, num_perm + 1):
+        n_rows = num_perm // n_bands
+        err = sum(_false_rates(threshold, n_bands, n_rows))
+        if err < best_err:
+            best, best_err = (n_bands, n_rows), err
+    return best
+
+
+def _find(parents, ii):
+    """Aux Function: find the root of a node, compressing the path"""
+    root = ii
+    while parents[root] != root:
+        root = parents[root]
+    while parents[ii] != root:
+        parents[ii], ii = root, parents[ii]
+    return root
+
+
+def _union(parents, ii, jj):
+    """Aux Function: merge the sets of two nodes"""
+    ri, rj = _find(parents, ii), _find(parents, jj)
+    if ri != rj:
+        parents[max(ri, rj)] = min(ri, rj)
+
+
+def minhash_signatures(records, fields=('TI', 'AB'), num_perm=128,
+                       shingle_size=3, seed=42):
+    """Compute MinHash signatures of records
+
+    Parameters
+    ----------
+    records : list-like of pymed.PubmedRecord
+        The records.
+    fields : list-like
+        The fields the text is taken from.
+    num_perm : int
+        The number of hash functions, i.e., the length of the signatures.
+    shingle_size : int
+        The number of consecutive words forming a shingle.
+    seed : int
+        The seed of the hash functions. Signatures are only comparable if
+        computed with the same seed.
+
+    Returns
+    -------
+    signatures : ndarray, shape (n_records, num_perm)
+        The signatures.
+    valid : ndarray of bool, shape (n_records,)
+        Whether the record contains at least shingle_size words in fields.
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, int(MERSENNE_PRIME), size=num_perm, dtype=np.int64)
+    b = rng.randint(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.int64)
+    a, b = a.astype(np.uint64), b.astype(np.uint64)
+    signatures = np.empty((len(records), num_perm), dtype=np.uint32)
+    valid = np.zeros(len(records), dtype=bool)
+    for ii, rec in enumerate(records):
+        shingles = _get_shingles(_get_text(rec, fields), shingle_size)
+        if len(shingles):
+            signatures[ii] = _minhash(shingles, a, b)
+            valid[ii] = True
+    return signatures, valid
+
+
+def near_duplicates(records, fields=('TI', 'AB'), threshold=0.8,
+                    num_perm=128, shingle_size=3, links=True, seed=42):
+    """Find groups of near-duplicate records
+
+    Candidate pairs are records that agree on all rows of at least one band
+    of their MinHash signatures. The candidates of a bucket are compared to
+    a representative, and those not matching it to a new representative,
+    so large buckets do not require all pairs to be compared. Records with
+    fewer than shingle_size words in fields are only grouped by links.
+
+    Parameters
+    ----------
+    records : list-like of pymed.PubmedRecord
+        The records.
+    fields : list-like
+        The fields to compare.
+    threshold : float
+        The Jaccard similarity of the word shingles above which records are
+        considered near duplicates.
+    num_perm : int
+        The number of hash functions used for the signatures.
+    shingle_size : int
+        The number of consecutive words forming a shingle.
+    links : bool
+        If True, records are also grouped when one references the other
+        through one of PMD.VERSION_TAGS, e.g., errata, retractions, updates
+        and republications.
+    seed : int
+        The seed of the hash functions.
+
+    Returns
+    -------
+    groups : list of list of int
+        The indices of records in each group of two or more records.
+    """
+    if not 0 < threshold <= 1:
+        raise ValueError('threshold must be in (0, 1], got %s' % threshold)
+    n_records = len(records)
+    parents = list(range(n_records))
+
+    signatures, valid = minhash_signatures(
+        records, fields=fields, num_perm=num_perm, shingle_size=shingle_size,
+        seed=seed)
+    n_bands, n_rows = _get_bands(threshold, num_perm)
+    idx = np.where(valid)[0]
+    for band in range(n_bands):
+        keys = np.ascontiguousarray(
+            signatures[idx, band * n_rows:(band + 1) * n_rows])
+        keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * n_rows)))
+        _, buckets = np.unique(keys.ravel(), return_inverse=True)
+        order = np.argsort(buckets, kind='mergesort')
+        splits = np.where(np.diff(buckets[order]))[0] + 1
+        starts = np.concatenate([[0], splits])
+        stops = np.concatenate([splits, [len(order)]])
+        shared = stops - starts > 1
+        for start, stop in zip(starts[shared], stops[shared]):
+            bucket = idx[order[start:stop]]
+            while len(bucket) > 1:
+                rep, rest = bucket[0], bucket[1:]
+                sim = np.mean(signatures[rest] == signatures[rep], axis=1)
+                for jj in rest[sim >= threshold]:
+                    _union(parents, rep, jj)
+                bucket = rest[sim < threshold]
+
+    if links:
+        index = dict((rec.get('PMID'), ii) for ii, rec in enumerate(records))
+        for ii, rec in enumerate(records):
+            for _, pmid in get_linked_pmids(rec, PMD.VERSION_TAGS):
+                if pmid in index:
+                    _union(parents, ii, index[pmid])
+
+    groups = {}
+    for ii in range(n_records):
+        groups.setdefault(_find(parents, ii), []).append(ii)
+    return sorted(g for g in groups.values() if len(g) > 1)
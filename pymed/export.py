@@ -0,0 +1,510 @@
+"""Export PubMed records for bibliography software"""
+
+# License: BSD (3-clause)
+
+import io
+import json
+import re
+from collections import deque, namedtuple
+from xml.sax.saxutils import escape
+
+from .constants import PMD
+from .features import _get_chunks
+from .utils import _parallel_imap
+
+BIBTEX_TMP = r"""
+@%(PT)s{%(KEY)s,
+Author = {%(AU)s},
+Title = {%(TI)s},
+Year = {%(YR)s},
+Journal = {%(JN)s},
+Number = {%(NU)s},
+Pages = {%(PG)s},
+Volume = {%(VOL)s}}
+"""
+
+NBIB_WIDTH = 70
+NBIB_INDENT = ' ' * 6
+# values that need normalization even if they fit on one line
+_NBIB_NEEDS_FILL = re.compile(r'\s\s|[\t\n\x0b\x0c\r]|^\s|\s$')
+
+
+def _bibtex_get_author(author_list, cache=None):
+    """Aux Function
+
+    Converts e.g. 'Guns PJ' to 'Guns, P.J'. Already formatted names can be
+    looked up in and are added to the dict cache.
+    """
+    out = []
+    for author in author_list:
+        name = cache.get(author) if cache is not None else None
+        if name is None:
+            surname, _, initials = author.rpartition(' ')
+            if surname:
+                name = '%s, %s' % (surname, '.'.join(initials))
+            else:
+                name = initials
+            if cache is not None:
+                cache[author] = name
+        out.append(name)
+
+    return ' and '.join(out)
+
+
+def _bibtex_make_id(author, journal, year):
+    """Aux Function"""
+    first = author[0].split(' ')[0] if author else 'na'
+    fmt = (''.join(c for c in first.lower() if c.isalpha()), str(year))
+    return ':'.join(fmt)
+
+
+def _bibtex_key_suffix(n):
+    """Aux Function: 0 -> '', 1 -> 'a', ..., 26 -> 'z', 27 -> 'aa', ..."""
+    out = ''
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        out = chr(ord('a') + rem) + out
+    return out
+
+
+def _bibtex_record_id(rec):
+    """Aux Function"""
+    return _bibtex_make_id(rec.get('AU') or [], rec.get('JT', 'NA'), rec.year)
+
+
+def _pmid_order(pmid):
+    """Aux Function: sort PubMed IDs numerically, missing IDs last"""
+    return (0, int(pmid)) if pmid and pmid.isdigit() else (1, pmid or '')
+
+
+class BibtexKeyIndex(object):
+    """Assign unique BibTex keys while exporting
+
+    Keys are made from the surname of the first author and the year, e.g.
+    'smith:2013'. Records sharing such a key are told apart by suffixes:
+    'smith:2013', 'smith:2013a', 'smith:2013b', ... The index only keeps
+    one counter per key, so keys are assigned in the same pass that
+    writes the records.
+
+    Parameters
+    ----------
+    records : list-like of pymed.PubmedRecord | None
+        If None, suffixes follow the order in which records are passed to
+        `get_key`. Otherwise, the records are indexed beforehand and
+        suffixes follow the PubMed IDs of the records sharing a key, hence
+        exporting the same records in any order gives identical keys.
+    """
+    def __init__(self, records=None):
+        self._counts = {}
+        self._ranks = None
+        if records is not None:
+            if iter(records) is records:
+                raise ValueError('Deterministic keys require a sequence of '
+                                 'records, not an iterator.')
+            groups = {}
+            for rec in records:
+                groups.setdefault(_bibtex_record_id(rec), []).append(
+                    rec.get('PMID'))
+            self._ranks = {}
+            for base, pmids in groups.items():
+                for rank, pmid in enumerate(sorted(pmids, key=_pmid_order)):
+                    self._ranks.setdefault((base, pmid), deque()).append(rank)
+
+    def get_key(self, rec):
+        """Get the key of the next record
+
+        Parameters
+        ----------
+        rec : instance of pymed.PubmedRecord
+            The record.
+
+        Returns
+        -------
+        key : str
+            The unique key.
+        """
+        base = _bibtex_record_id(rec)
+        ranks = (self._ranks.get((base, rec.get('PMID')))
+                 if self._ranks is not None else None)
+        if ranks:
+            n = ranks.popleft()
+        else:
+            n = self._counts.get(base, 0)
+            self._counts[base] = n + 1
+        return base + _bibtex_key_suffix(n)
+
+
+def _bibtex_get_pages(pages_str):
+    """Aux Function"""
+    if PMD.SEP_PAGES_ENTRY in pages_str:
+        pages_str = pages_str.split(PMD.SEP_PAGES_ENTRY)[0]
+    if '-' in pages_str:
+        pfrom, pto = [int(k) for k in pages_str.split(PMD.SEP_PAGES_RANGE)]
+        if pfrom > pto:
+            pto += pfrom
+        pages_str = PMD.SEP_PAGES_RANGE.join([str(k) for k in [pfrom, pto]])
+
+    return pages_str
+
+
+def _bibtex_get_publication_type(ins):
+    """Aux Function"""
+    out = 'article'
+    # XXX currently only article supported.
+    return out
+
+
+def format_bibtex(rec, key=None, author_cache=None):
+    """Format a record as BibTex entry
+
+    Parameters
+    ----------
+    rec : instance of pymed.PubmedRecord
+        The record.
+    key : str | None
+        The citation key. If None, it is made from the surname of the first
+        author and the year.
+    author_cache : dict | None
+        Formatted author names to reuse across records.
+
+    Returns
+    -------
+    bibtex_record : str
+        The record in BibTex format.
+    """
+    authors = rec.get('AU') or []
+    if key is None:
+        key = _bibtex_record_id(rec)
+    fmt = {
+        'PT': _bibtex_get_publication_type(rec.get('PT', 'NA')),
+        'KEY': key,
+        'AU': _bibtex_get_author(authors, author_cache) or 'NA',
+        'TI': rec.get('TI', 'NA'),
+        'JN': rec.get('JT', 'NA').replace('&', '\\&'),
+        'YR': '%s' % rec.year,
+        'NU': rec.get('IP', 'NA'),
+        'VOL': rec.get('VI', 'NA'),
+        'PG': rec.get('PG', 'NA')
+    }
+    return BIBTEX_TMP % fmt
+
+
+def _nbib_fill(value):
+    """Aux Function: wrap a value at whitespace into indented lines
+
+    Unlike textwrap.fill, words are never split, neither at hyphens nor
+    when longer than a line, as Medline readers join continuation lines
+    with a space.
+    """
+    if len(value) <= NBIB_WIDTH and not _NBIB_NEEDS_FILL.search(value):
+        return value
+    lines, line, size = [], [], 0
+    width = NBIB_WIDTH
+    for word in value.split():
+        if line and size + 1 + len(word) > width:
+            lines.append(' '.join(line))
+            line, size = [], 0
+            width = NBIB_WIDTH - len(NBIB_INDENT)
+        size += len(word) + (1 if line else 0)
+        line.append(word)
+    lines.append(' '.join(line))
+    return ('\n' + NBIB_INDENT).join(lines)
+
+
+def format_nbib(rec):
+    """Format a record in Medline format
+
+    Parameters
+    ----------
+    rec : instance of pymed.PubmedRecord
+        The record.
+
+    Returns
+    -------
+    nbib_record : str
+        The record in Medline format.
+    """
+    out = ['\n\nPMID- ', rec.get('PMID')]
+    for k, v in rec.items():
+        if k != 'PMID':
+            if isinstance(v, list):
+                v = ' '.join(v)
+            out.extend(['\n', k.ljust(4), '- ', _nbib_fill(v)])
+    return ''.join(out)
+
+
+# Medline tags and their RIS counterparts, in order of output
+RIS_FIELDS = [('TI', 'TI'), ('JT', 'T2'), ('TA', 'J2'), ('VI', 'VL'),
+              ('IP', 'IS'), ('IS', 'SN'), ('PL', 'CY'), ('LA', 'LA'),
+              ('MH', 'KW'), ('OT', 'KW'), ('AB', 'AB'), ('PMID', 'AN')]
+
+# Medline tags and their CSL-JSON variables
+CSL_FIELDS = [('TI', 'title'), ('JT', 'container-title'),
+              ('TA', 'container-title-short'), ('VI', 'volume'),
+              ('IP', 'issue'), ('PG', 'page'), ('IS', 'ISSN'),
+              ('LA', 'language'), ('AB', 'abstract'), ('PMID', 'PMID'),
+              ('PMC', 'PMCID')]
+
+# Medline tags and their EndNote XML elements, in order of output
+ENDNOTE_FIELDS = [('PG', 'pages'), ('VI', 'volume'), ('IP', 'number'),
+                  ('IS', 'isbn'), ('PMID', 'accession-num'),
+                  ('AB', 'abstract'), ('LA', 'language')]
+ENDNOTE_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n<xml><records>\n'
+ENDNOTE_FOOTER = '\n</records></xml>\n'
+
+
+def _as_list(value):
+    """Aux Function"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _split_pages(pages):
+    """Aux Function: first and last page, e.g. '2298-301' -> 2298, 2301"""
+    pages = pages.split(PMD.SEP_PAGES_ENTRY)[0].strip()
+    first, _, last = pages.partition('-')
+    first, last = first.strip(), last.strip()
+    if len(last) < len(first) and first.isdigit() and last.isdigit():
+        last = first[:len(first) - len(last)] + last
+    return first, last
+
+
+def _split_author(author):
+    """Aux Function: family and given names from FAU or AU entries"""
+    if ',' in author:
+        family, _, given = author.partition(',')
+    else:
+        family, _, given = author.rpartition(' ')
+        if not family:
+            family, given = given, ''
+    return family.strip(), given.strip()
+
+
+def _get_authors(rec):
+    """Aux Function: full author names if available"""
+    return _as_list(rec.get('FAU') or rec.get('AU'))
+
+
+def format_ris(rec):
+    """Format a record in RIS format
+
+    Parameters
+    ----------
+    rec : instance of pymed.PubmedRecord
+        The record.
+
+    Returns
+    -------
+    ris_record : str
+        The record in RIS format.
+    """
+    out = ['TY  - JOUR']
+    out.extend('AU  - %s' % author for author in _get_authors(rec))
+    for field, tag in RIS_FIELDS:
+        out.extend('%s  - %s' % (tag, value)
+                   for value in _as_list(rec.get(field)))
+    date = rec.pub_date
+    if date is not None:
+        out.append('PY  - %i' % date.year)
+        out.append('DA  - %i/%s/%s/' % (
+            date.year, '%02i' % date.month if date.month else '',
+            '%02i' % date.day if date.day else ''))
+    if rec.get('PG'):
+        first, last = _split_pages(rec['PG'])
+        out.append('SP  - %s' % first)
+        if last:
+            out.append('EP  - %s' % last)
+    doi = rec.get_doi()
+    if doi is not None:
+        out.append('DO  - %s' % doi)
+    out.append('ER  - \n')
+    return '\n'.join(out)
+
+
+def format_csljson(rec):
+    """Format a record as CSL-JSON item
+
+    Parameters
+    ----------
+    rec : instance of pymed.PubmedRecord
+        The record.
+
+    Returns
+    -------
+    csl_record : str
+        The record as CSL-JSON object.
+    """
+    item = {'id': rec.get('PMID'), 'type': 'article-journal'}
+    for field, variable in CSL_FIELDS:
+        value = rec.get(field)
+        if value:
+            item[variable] = ', '.join(value) if isinstance(
+                value, list) else value
+    authors = [_split_author(author) for author in _get_authors(rec)]
+    if authors:
+        item['author'] = [{'family': family, 'given': given}
+                          for family, given in authors]
+    date = rec.pub_date
+    if date is not None:
+        item['issued'] = {'date-parts': [
+            [d for d in (date.year, date.month, date.day) if d is not None]]}
+    doi = rec.get_doi()
+    if doi is not None:
+        item['DOI'] = doi
+    return json.dumps(item, ensure_ascii=False, sort_keys=True)
+
+
+def _xml_element(tag, value):
+    """Aux Function"""
+    return '<%s>%s</%s>' % (tag, escape(value), tag)
+
+
+def format_endnote(rec):
+    """Format a record as EndNote XML record
+
+    Parameters
+    ----------
+    rec : instance of pymed.PubmedRecord
+        The record.
+
+    Returns
+    -------
+    endnote_record : str
+        The record as EndNote XML element.
+    """
+    out = ['<record><ref-type name="Journal Article">17</ref-type>']
+    authors = _get_authors(rec)
+    if authors:
+        out.append('<contributors><authors>%s</authors></contributors>'
+                   % ''.join(_xml_element('author', a) for a in authors))
+    out.append('<titles>')
+    if rec.get('TI'):
+        out.append(_xml_element('title', rec['TI']))
+    if rec.get('JT'):
+        out.append(_xml_element('secondary-title', rec['JT']))
+    out.append('</titles>')
+    if rec.get('JT') or rec.get('TA'):
+        out.append('<periodical>%s%s</periodical>' % (
+            _xml_element('full-title', rec['JT']) if rec.get('JT') else '',
+            _xml_element('abbr-1', rec['TA']) if rec.get('TA') else ''))
+    for field, tag in ENDNOTE_FIELDS:
+        value = rec.get(field)
+        if value:
+            out.append(_xml_element(tag, ' '.join(_as_list(value))))
+    keywords = _as_list(rec.get('MH'))
+    if keywords:
+        out.append('<keywords>%s</keywords>' % ''.join(
+            _xml_element('keyword', k) for k in keywords))
+    if rec.year is not None:
+        out.append('<dates>%s<pub-dates>%s</pub-dates></dates>' % (
+            _xml_element('year', str(rec.year)),
+            _xml_element('date', rec['DP'])))
+    doi = rec.get_doi()
+    if doi is not None:
+        out.append(_xml_element('electronic-resource-num', doi))
+    out.append('</record>')
+    return ''.join(out)
+
+
+ExportFormat = namedtuple('ExportFormat', ['formatter', 'extension', 'header',
+                                           'separator', 'footer'])
+
+EXPORT_FORMATS = {
+    'bibtex': ExportFormat(format_bibtex, '.bib', '', '', ''),
+    'nbib': ExportFormat(format_nbib, '.nbib', '', '', ''),
+    'ris': ExportFormat(format_ris, '.ris', '', '\n', ''),
+    'csljson': ExportFormat(format_csljson, '.json', '[\n', ',\n', '\n]\n'),
+    'endnote': ExportFormat(format_endnote, '.xml', ENDNOTE_HEADER, '\n',
+                            ENDNOTE_FOOTER),
+}
+
+
+def _iter_included(records):
+    """Aux Function: iterate over records not marked for exclusion"""
+    exclude = set(getattr(records, 'exclude_', []))
+    for ii, rec in enumerate(records):
+        if ii not in exclude:
+            yield rec
+
+
+def _format_chunk(args):
+    """Aux Function: format a chunk of records as one block of text"""
+    formatter, separator, chunk, keys = args
+    if keys is None:
+        return separator.join([formatter(rec) for rec in chunk])
+    cache = {}
+    return separator.join([formatter(rec, key=key, author_cache=cache)
+                           for rec, key in zip(chunk, keys)])
+
+
+def _as_text(text):
+    """Aux Function: decode byte strings, e.g., str on Python 2"""
+    return text.decode('utf-8') if isinstance(text, bytes) else text
+
+
+def _write_blocks(blocks, fname, header='', separator='', footer=''):
+    """Aux Function: write blocks of text to a utf-8 encoded file"""
+    separator = _as_text(separator)
+    with io.open(fname, 'w', encoding='utf-8') as fd:
+        fd.write(_as_text(header))
+        for ii, block in enumerate(blocks):
+            if ii and separator:
+                fd.write(separator)
+            fd.write(_as_text(block))
+        fd.write(_as_text(footer))
+
+
+def export_records(records, fname, fmt, n_jobs=1, chunksize=1000,
+                   key_index=None):
+    """Write records to file in chunks
+
+    Records are formatted in chunks, each of which is written at once. The
+    records are consumed lazily, hence iterators can be exported without
+    holding all records in memory.
+
+    Parameters
+    ----------
+    records : iterable of pymed.PubmedRecord
+        The records. Indices in the `exclude_` attribute, if present, are
+        skipped.
+    fname : str
+        The name of the file. The extension of the format is appended if
+        missing.
+    fmt : str
+        The format, one of 'bibtex', 'nbib', 'ris', 'csljson' (a JSON array
+        of CSL items) or 'endnote' (EndNote XML).
+    n_jobs : int
+        The number of processes formatting chunks in parallel. Chunks are
+        written in the order of the records. If -1, all CPUs are used.
+    chunksize : int
+        The number of records formatted and written at once.
+    key_index : instance of BibtexKeyIndex | None
+        The index assigning the BibTex keys. If None, keys follow the order
+        of the records. Only used if fmt is 'bibtex'.
+
+    Returns
+    -------
+    fname : str
+        The name of the file written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError('fmt must be one of %s, got %s.'
+                         % (', '.join(sorted(EXPORT_FORMATS)), fmt))
+    export = EXPORT_FORMATS[fmt]
+    if not fname.endswith(export.extension):
+        fname += export.extension
+    if fmt == 'bibtex' and key_index is None:
+        key_index = BibtexKeyIndex()
+    elif fmt != 'bibtex':
+        key_index = None
+
+    def iter_tasks():
+        for chunk in _get_chunks(_iter_included(records), chunksize):
+            keys = (None if key_index is None else
+                    [key_index.get_key(rec) for rec in chunk])
+            yield export.formatter, export.separator, chunk, keys
+
+    _write_blocks(_parallel_imap(_format_chunk, iter_tasks(), n_jobs), fname,
+                  export.header, export.separator, export.footer)
+    return fname
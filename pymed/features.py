@@ -0,0 +1,285 @@
+"""Feature extraction from PubMed records"""
+
+# License: BSD (3-clause)
+
+import re
+import unicodedata
+import zlib
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from .utils import _parallel_imap
+
+TOKEN_REGEX = re.compile(r'(?u)\b\w\w+\b')
+MATRIX_KINDS = ('tfidf', 'count', 'mesh-onehot')
+
+
+def _get_chunks(iterable, n):
+    """Aux Function: group items in lists of length n, keep the remainder"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == n:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _hash_term(term, n_features):
+    """Aux Function: map a term to a column, stable across processes"""
+    if not isinstance(term, bytes):
+        term = term.encode('utf-8')
+    return (zlib.crc32(term) & 0xffffffff) % n_features
+
+
+def _strip_mesh(term):
+    """Aux Function: remove qualifiers and major topic marks from MeSH term
+
+    E.g. 'Brain/*pathology' and '*Brain' both become 'Brain'.
+    """
+    return term.split('/')[0].lstrip('*')
+
+
+def _normalize_author(name):
+    """Aux Function: lower-case author names, drop accents and periods
+
+    E.g. 'M\xfcller, Hans-J.' becomes 'muller, hans-j'.
+    """
+    if isinstance(name, bytes):
+        name = name.decode('utf-8')
+    name = unicodedata.normalize('NFKD', name)
+    name = u''.join(c for c in name if not unicodedata.combining(c))
+    return u' '.join(name.replace(u'.', u' ').lower().split())
+
+
+def _get_text(rec, fields):
+    """Aux Function: concatenate the values of fields"""
+    out = []
+    for field in fields:
+        value = rec.get(field)
+        if value:
+            out.append(' '.join(value) if isinstance(value, list) else value)
+    return ' '.join(out)
+
+
+def _get_terms(rec, fields):
+    """Aux Function: collect list-valued controlled terms"""
+    out = []
+    for field in fields:
+        value = rec.get(field, [])
+        out.extend([value] if not isinstance(value, list) else value)
+    return out
+
+
+def _analyze_chunk(args):
+    """Aux Function: count the terms of a chunk of documents
+
+    Runs in the worker processes, hence the single tuple argument.
+    """
+    docs, kind, n_features = args
+    out = []
+    for doc in docs:
+        if kind == 'mesh-onehot':
+            terms = Counter(set(_strip_mesh(t) for t in doc))
+        else:
+            terms = Counter(TOKEN_REGEX.findall(doc.lower()))
+        if n_features is not None:
+            hashed = Counter()
+            for term, count in terms.items():
+                hashed[_hash_term(term, n_features)] += count
+            terms = hashed
+        out.append((list(terms.keys()), list(terms.values())))
+    return out
+
+
+def to_matrix(records, fields=None, vocabulary=None, kind='tfidf', n_jobs=1,
+              chunksize=1000):
+    """Build a sparse document-term matrix from records
+
+    The matrix is built in a single pass over the records.
+
+    Parameters
+    ----------
+    records : iterable of pymed.PubmedRecord
+        The records. Each record corresponds to one row of the matrix.
+    fields : list-like | None
+        The fields to extract the terms from. If None, defaults to Title and
+        Abstract for 'tfidf' and 'count' and to MeSH Terms for 'mesh-onehot'.
+    vocabulary : dict | int | None
+        The mapping from terms to columns. Terms missing from the mapping
+        are ignored. If int, terms are hashed into this number of columns,
+        which requires no vocabulary to be held in memory. If None, the
+        vocabulary is learned from the records in order of appearance.
+    kind : str
+        'count' for term counts, 'tfidf' for l2-normalized term counts
+        weighted by smoothed inverse document frequencies, 'mesh-onehot'
+        for the presence of MeSH headings (qualifiers are stripped).
+    n_jobs : int
+        The number of processes used for tokenization. If -1, all CPUs are
+        used.
+    chunksize : int
+        The number of records passed to a process at once.
+
+    Returns
+    -------
+    matrix : instance of scipy.sparse.csr_matrix
+        The document-term matrix, shape (n_records, n_terms).
+    vocabulary : dict | int
+        The mapping from terms to columns, or the number of hashed columns.
+    pmids : list of str
+        The PubMed ID of the record at each row.
+    """
+    from scipy import sparse
+
+    if kind not in MATRIX_KINDS:
+        raise ValueError('kind must be one of %s, got %s.'
+                         % (', '.join(MATRIX_KINDS), kind))
+    if fields is None:
+        fields = ('MH',) if kind == 'mesh-onehot' else ('TI', 'AB')
+    elif not isinstance(fields, (list, tuple)):
+        fields = (fields,)
+    get_doc = _get_terms if kind == 'mesh-onehot' else _get_text
+
+    n_features = None
+    fixed = vocabulary is not None
+    if isinstance(vocabulary, int):
+        n_features, vocabulary = vocabulary, None
+    elif vocabulary is None:
+        vocabulary = {}
+
+    pmids = []
+
+    def iter_docs():
+        for rec in records:
+            pmids.append(rec.get('PMID'))
+            yield get_doc(rec, fields)
+
+    tasks = ((docs, kind, n_features)
+             for docs in _get_chunks(iter_docs(), chunksize))
+    indptr, indices, data = array('l', [0]), array('l'), array('d')
+    for chunk in _parallel_imap(_analyze_chunk, tasks, n_jobs):
+        for terms, counts in chunk:
+            if fixed and n_features is None:
+                pairs = [(vocabulary[t], c) for t, c in zip(terms, counts)
+                         if t in vocabulary]
+                terms = [t for t, _ in pairs]
+                counts = [c for _, c in pairs]
+            elif not fixed:
+                terms = [vocabulary.setdefault(t, len(vocabulary))
+                         for t in terms]
+            indices.extend(terms)
+            data.extend(counts)
+            indptr.append(len(indices))
+
+    if n_features is None:
+        n_features = max(vocabulary.values()) + 1 if vocabulary else 0
+    else:
+        vocabulary = n_features
+    matrix = sparse.csr_matrix((np.array(data, dtype=np.float64),
+                                np.array(indices, dtype=np.int64),
+                                np.array(indptr, dtype=np.int64)),
+                               shape=(len(indptr) - 1, n_features))
+    matrix.sort_indices()
+
+    if kind == 'mesh-onehot':
+        matrix.data[:] = 1.  # hashed headings may share a column
+    elif kind == 'tfidf':
+        df = np.bincount(matrix.indices, minlength=n_features)
+        idf = np.log((1. + matrix.shape[0]) / (1. + df)) + 1.
+        matrix.data *= idf[matrix.indices]
+        norms = np.sqrt(np.bincount(
+            np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr)),
+            weights=matrix.data ** 2, minlength=matrix.shape[0]))
+        norms[norms == 0] = 1.
+        matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+
+    return matrix, vocabulary, pmids
+
+
+def _cooccurrence_chunk(args):
+    """Aux Function: normalize and deduplicate the terms of records"""
+    docs, field, normalize = args
+    if not normalize:
+        func = None
+    elif field == 'MH':
+        func = _strip_mesh
+    elif field in ('AU', 'FAU'):
+        func = _normalize_author
+    else:
+        func = None
+    out = []
+    for terms in docs:
+        if func is not None:
+            terms = [func(t) for t in terms]
+        seen = set()
+        out.append([t for t in terms if not (t in seen or seen.add(t))])
+    return out
+
+
+def cooccurrence(records, field='MH', normalize=True, vocabulary=None,
+                 n_jobs=1, chunksize=1000):
+    """Count how often pairs of terms occur in the same record
+
+    The records are converted to a sparse record-term incidence matrix X
+    in a single pass, the co-occurrence counts are given by X.T * X.
+
+    Parameters
+    ----------
+    records : iterable of pymed.PubmedRecord
+        The records.
+    field : str
+        The list-valued field, e.g. 'MH' for MeSH-MeSH co-occurrence or
+        'AU' and 'FAU' for co-authorship.
+    normalize : bool
+        If True, qualifiers and major topic marks are stripped from MeSH
+        headings, and author names are lower-cased without accents and
+        periods, so spelling variants are counted together.
+    vocabulary : dict | None
+        The mapping from terms to rows and columns, e.g. as returned by a
+        previous call. Terms missing from the mapping are ignored. If None,
+        the vocabulary is learned from the records in order of appearance.
+    n_jobs : int
+        The number of processes used for normalizing terms. If -1, all
+        CPUs are used.
+    chunksize : int
+        The number of records passed to a process at once.
+
+    Returns
+    -------
+    matrix : instance of scipy.sparse.csr_matrix
+        The symmetric matrix of counts, shape (n_terms, n_terms). The
+        diagonal contains the number of records of each term.
+    vocabulary : dict
+        The mapping from terms to rows and columns.
+    """
+    from scipy import sparse
+
+    fixed = vocabulary is not None
+    if not fixed:
+        vocabulary = {}
+    docs = (_get_terms(rec, (field,)) for rec in records)
+    tasks = ((chunk, field, normalize)
+             for chunk in _get_chunks(docs, chunksize))
+    indptr, indices = array('l', [0]), array('l')
+    for chunk in _parallel_imap(_cooccurrence_chunk, tasks, n_jobs):
+        for terms in chunk:
+            if fixed:
+                indices.extend(vocabulary[t] for t in terms
+                               if t in vocabulary)
+            else:
+                indices.extend(vocabulary.setdefault(t, len(vocabulary))
+                               for t in terms)
+            indptr.append(len(indices))
+
+    n_terms = max(vocabulary.values()) + 1 if vocabulary else 0
+    indices = np.array(indices, dtype=np.int64)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.int64), indices,
+         np.array(indptr, dtype=np.int64)),
+        shape=(len(indptr) - 1, n_terms))
+    matrix = (incidence.T * incidence).tocsr()
+    matrix.sort_indices()
+    return matrix, vocabulary
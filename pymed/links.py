@@ -0,0 +1,243 @@
+"""Relationships between PubMed records"""
+
+# License: BSD (3-clause)
+
+import re
+from array import array
+
+import numpy as np
+
+from .constants import PMD
+
+PMID_REGEX = re.compile(r'PMID:\s*(\d+)')
+
+
+def get_linked_pmids(rec, tags=None):
+    """Parse the PubMed IDs referenced by the link tags of a record
+
+    Parameters
+    ----------
+    rec : instance of pymed.PubmedRecord
+        The record.
+    tags : list-like | None
+        The link tags to parse. If None, defaults to PMD.LINK_TAGS.
+
+    Returns
+    -------
+    links : list of tuple
+        The (tag, PubMed ID) pairs. Entries without a PubMed ID, e.g.
+        'Magn Reson Med. 2011 May;65(5):1507', are ignored.
+    """
+    if tags is None:
+        tags = PMD.LINK_TAGS
+    links = []
+    for tag in tags:
+        values = rec.get(tag)
+        if not values:
+            continue
+        if not isinstance(values, list):
+            values = [values]
+        for value in values:
+            links.extend((tag, pmid) for pmid in PMID_REGEX.findall(value))
+    return links
+
+
+def _as_tag_codes(tags, tag_names):
+    """Aux Function: convert tag names to their integer codes"""
+    for tag in tags:
+        if tag not in tag_names:
+            raise ValueError('%s is not a tag of this graph. Please use one '
+                             'of %s' % (tag, ', '.join(tag_names)))
+    return np.array([tag_names.index(tag) for tag in tags], dtype=np.int8)
+
+
+class LinkGraph(object):
+    """Graph of the links between PubMed records
+
+    Nodes are the PubMed IDs of the records and of all records they
+    reference. Directed edges point from the record carrying a link tag to
+    the referenced record and are stored in compressed sparse row format,
+    i.e., the targets of node `ii` are `indices[indptr[ii]:indptr[ii + 1]]`.
+
+    Parameters
+    ----------
+    records : iterable of pymed.PubmedRecord
+        The records. Records without PubMed ID are skipped.
+    tags : list-like | None
+        The link tags to parse. If None, defaults to PMD.LINK_TAGS.
+
+    Attributes
+    ----------
+    pmids : ndarray of int, shape (n_nodes,)
+        The sorted PubMed IDs of the nodes.
+    in_corpus : ndarray of bool, shape (n_nodes,)
+        Whether a node is one of the records, as opposed to being only
+        referenced.
+    indptr : ndarray of int, shape (n_nodes + 1,)
+        The offsets of the edges of each node.
+    indices : ndarray of int, shape (n_edges,)
+        The target node of each edge.
+    edge_tags : ndarray of int, shape (n_edges,)
+        The tag of each edge, as position in `tag_names`.
+    tag_names : list of str
+        The link tags.
+    retracted : ndarray of bool, shape (n_nodes,)
+        Whether a node has been retracted (RIN, ROF).
+    superseded : ndarray of bool, shape (n_nodes,)
+        Whether a node has been updated or corrected and republished (UIN,
+        UOF, CRI, CRF).
+    """
+    def __init__(self, records, tags=None):
+        self.tag_names = list(PMD.LINK_TAGS if tags is None else tags)
+        nodes, sources, targets = array('l'), array('l'), array('l')
+        codes = array('b')
+        for rec in records:
+            pmid = rec.get('PMID')
+            if not pmid:
+                continue
+            pmid = int(pmid)
+            nodes.append(pmid)
+            for tag, target in get_linked_pmids(rec, self.tag_names):
+                sources.append(pmid)
+                targets.append(int(target))
+                codes.append(self.tag_names.index(tag))
+        nodes = np.array(nodes, dtype=np.int64)
+        sources = np.array(sources, dtype=np.int64)
+        targets = np.array(targets, dtype=np.int64)
+
+        self.pmids = np.unique(np.concatenate([nodes, targets]))
+        n_nodes = len(self.pmids)
+        self.in_corpus = np.zeros(n_nodes, dtype=bool)
+        self.in_corpus[np.searchsorted(self.pmids, nodes)] = True
+        sources = np.searchsorted(self.pmids, sources)
+        targets = np.searchsorted(self.pmids, targets)
+        order = np.lexsort((targets, sources))
+        self.indptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(sources, minlength=n_nodes))])
+        self.indices = targets[order]
+        self.edge_tags = np.array(codes, dtype=np.int8)[order]
+        self._sources = sources[order]
+        self._reverse = None
+
+        self.retracted = self._flag(['RIN'], ['ROF'])
+        self.superseded = self._flag(['UIN', 'CRI'], ['UOF', 'CRF'])
+
+    def _flag(self, out_tags, in_tags):
+        """Aux method: mark sources of out_tags and targets of in_tags"""
+        flags = np.zeros(len(self.pmids), dtype=bool)
+        for tags, nodes in ((out_tags, self._sources),
+                            (in_tags, self.indices)):
+            tags = [t for t in tags if t in self.tag_names]
+            if tags:
+                mask = np.isin(self.edge_tags,
+                               _as_tag_codes(tags, self.tag_names))
+                flags[nodes[mask]] = True
+        return flags
+
+    @property
+    def n_nodes(self):
+        """The number of nodes"""
+        return len(self.pmids)
+
+    @property
+    def n_edges(self):
+        """The number of edges"""
+        return len(self.indices)
+
+    def index(self, pmid):
+        """Get the position of a PubMed ID in the node arrays
+
+        Parameters
+        ----------
+        pmid : int | str
+            The PubMed ID.
+
+        Returns
+        -------
+        index : int
+            The position of the node.
+        """
+        pmid = int(pmid)
+        idx = np.searchsorted(self.pmids, pmid)
+        if idx == len(self.pmids) or self.pmids[idx] != pmid:
+            raise KeyError('PubMed ID %s is not part of the graph' % pmid)
+        return int(idx)
+
+    def neighbors(self, pmid, tags=None, direction='out'):
+        """Get the linked PubMed IDs
+
+        Parameters
+        ----------
+        pmid : int | str
+            The PubMed ID.
+        tags : list-like | None
+            The link tags to follow. If None, all tags are followed.
+        direction : str
+            'out' for the records referenced by this record, 'in' for the
+            records referencing this record, 'both' for either.
+
+        Returns
+        -------
+        pmids : ndarray of int
+            The sorted PubMed IDs of the neighbors.
+        """
+        if direction not in ('out', 'in', 'both'):
+            raise ValueError('direction must be out, in or both, got %s'
+                             % direction)
+        idx = self.index(pmid)
+        graphs = []
+        if direction in ('out', 'both'):
+            graphs.append((self.indptr, self.indices, self.edge_tags))
+        if direction in ('in', 'both'):
+            graphs.append(self._get_reverse())
+        nodes = []
+        for indptr, indices, edge_tags in graphs:
+            start, stop = indptr[idx], indptr[idx + 1]
+            these = indices[start:stop]
+            if tags is not None:
+                these = these[np.isin(edge_tags[start:stop],
+                                      _as_tag_codes(tags, self.tag_names))]
+            nodes.append(these)
+        return self.pmids[np.unique(np.concatenate(nodes))]
+
+    def _get_reverse(self):
+        """Aux method: the graph in compressed sparse row format by target"""
+        if self._reverse is None:
+            order = np.lexsort((self._sources, self.indices))
+            indptr = np.concatenate([[0], np.cumsum(
+                np.bincount(self.indices, minlength=self.n_nodes))])
+            self._reverse = (indptr, self._sources[order],
+                             self.edge_tags[order])
+        return self._reverse
+
+    def to_sparse(self):
+        """Get the adjacency matrix
+
+        Returns
+        -------
+        adjacency : instance of scipy.sparse.csr_matrix
+            The number of links from row to column node, shape
+            (n_nodes, n_nodes).
+        """
+        from scipy import sparse
+        return sparse.csr_matrix(
+            (np.ones(self.n_edges), self.indices, self.indptr),
+            shape=(self.n_nodes, self.n_nodes))
+
+    def connected_components(self):
+        """Find groups of linked records, ignoring the edge directions
+
+        Returns
+        -------
+        n_components : int
+            The number of components.
+        labels : ndarray of int, shape (n_nodes,)
+            The component of each node.
+        """
+        from scipy.sparse.csgraph import connected_components
+        return connected_components(self.to_sparse(), directed=False)
+
+    def __repr__(self):
+        """ Summarize LinkGraph """
+        return ('<LinkGraph | %i nodes (%i records), %i edges>'
+                % (self.n_nodes, self.in_corpus.sum(), self.n_edges))
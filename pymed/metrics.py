@@ -0,0 +1,155 @@
+"""Instrumentation of the download pipeline
+
+`query_records` reports events to callbacks and, at DEBUG level, to the
+'pymed' logger, which also receives progress messages at INFO level.
+Events are only created if a callback is given or debug logging is
+enabled, otherwise instrumentation costs a single comparison per request.
+
+Events are passed as keyword arguments:
+
+- 'phase': a step is completed, with `phase` ('esearch', 'efetch',
+  'parse' or 'filter'), `duration` in seconds and, depending on
+  the phase, `n_bytes` received and `n_records` processed.
+- 'retry': a request failed and is repeated, with `phase`, `error` and
+  `wait`, the seconds slept before the next attempt.
+- 'throttle': a request was delayed to respect the NCBI rate limit, with
+  `phase` and `wait`, the seconds slept. The wait is not part of the
+  duration of the phase.
+- 'done': the query is completed, with `n_records` and `duration`.
+"""
+
+# License: BSD (3-clause)
+
+import logging
+from collections import Counter
+
+logger = logging.getLogger('pymed')
+logger.addHandler(logging.NullHandler())
+
+PHASES = ('esearch', 'efetch', 'parse', 'filter')
+
+
+def _log_event(event, **info):
+    """Aux Function: log an event at debug level"""
+    logger.debug('%s %s', event, ' '.join(
+        '%s=%s' % (k, info[k]) for k in sorted(info)))
+
+
+def _get_emit(callback):
+    """Aux Function: combine callbacks, None if nothing listens"""
+    if callback is None:
+        callbacks = []
+    elif isinstance(callback, (list, tuple)):
+        callbacks = list(callback)
+    else:
+        callbacks = [callback]
+    if logger.isEnabledFor(logging.DEBUG):
+        callbacks.append(_log_event)
+    if not callbacks:
+        return None
+
+    def emit(event, **info):
+        for func in callbacks:
+            func(event, **info)
+    return emit
+
+
+class QueryMetrics(object):
+    """Collect the events of `query_records`
+
+    Instances are callbacks, e.g.
+    `query_records(term, client, callback=metrics)`, and can be shared
+    across several queries.
+
+    Attributes
+    ----------
+    phase_seconds : instance of collections.Counter
+        The cumulative duration of each phase in seconds.
+    phase_calls : instance of collections.Counter
+        The number of times each phase was completed.
+    n_bytes : int
+        The number of bytes received.
+    n_records : int
+        The number of records downloaded.
+    n_retries : instance of collections.Counter
+        The number of retries per phase.
+    wait_seconds : float
+        The time spent waiting before retries, including waits requested
+        by the server with HTTP 429 (Too Many Requests).
+    throttle_seconds : float
+        The time requests were delayed to respect the NCBI rate limit.
+    duration : float
+        The total duration of the completed queries in seconds.
+    """
+    def __init__(self):
+        self.phase_seconds = Counter()
+        self.phase_calls = Counter()
+        self.n_bytes = 0
+        self.n_records = 0
+        self.n_retries = Counter()
+        self.wait_seconds = 0.
+        self.throttle_seconds = 0.
+        self.duration = 0.
+
+    def __call__(self, event, **info):
+        if event == 'phase':
+            phase = info['phase']
+            self.phase_seconds[phase] += info['duration']
+            self.phase_calls[phase] += 1
+            self.n_bytes += info.get('n_bytes', 0)
+        elif event == 'retry':
+            self.n_retries[info['phase']] += 1
+            self.wait_seconds += info['wait']
+        elif event == 'throttle':
+            self.throttle_seconds += info['wait']
+        elif event == 'done':
+            self.n_records += info['n_records']
+            self.duration += info['duration']
+
+    @property
+    def records_per_second(self):
+        """The download throughput"""
+        return self.n_records / self.duration if self.duration else 0.
+
+    def to_prometheus(self, prefix='pymed_query'):
+        """Export the counters in the Prometheus text format
+
+        Parameters
+        ----------
+        prefix : str
+            The prefix of the metric names.
+
+        Returns
+        -------
+        text : str
+            The metrics, e.g. 'pymed_query_records_total 120'.
+        """
+        out = []
+
+        def add(name, kind, doc, values):
+            name = '%s_%s' % (prefix, name)
+            out.append('# HELP %s %s' % (name, doc))
+            out.append('# TYPE %s %s' % (name, kind))
+            for labels, value in values:
+                out.append('%s%s %s' % (name, labels, repr(value)))
+
+        def by_phase(counter):
+            return [('{phase="%s"}' % p, counter[p]) for p in PHASES
+                    if p in counter]
+
+        add('phase_seconds_total', 'counter', 'Time spent in each phase.',
+            by_phase(self.phase_seconds))
+        add('phase_calls_total', 'counter', 'Completed steps per phase.',
+            by_phase(self.phase_calls))
+        add('retries_total', 'counter', 'Retried requests per phase.',
+            by_phase(self.n_retries))
+        add('received_bytes_total', 'counter', 'Bytes received.',
+            [('', self.n_bytes)])
+        add('records_total', 'counter', 'Records downloaded.',
+            [('', self.n_records)])
+        add('wait_seconds_total', 'counter', 'Time waited before retries.',
+            [('', self.wait_seconds)])
+        add('throttle_seconds_total', 'counter',
+            'Time requests were delayed by the rate limit.',
+            [('', self.throttle_seconds)])
+        return '\n'.join(out) + '\n'
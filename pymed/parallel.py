@@ -0,0 +1,94 @@
+"""Process-parallel map and filter over records"""
+
+# License: BSD (3-clause)
+
+import numpy as np
+
+from .features import _get_chunks
+from .utils import _parallel_imap
+
+
+def _map_chunk(args):
+    """Aux Function: apply func to a chunk of records"""
+    func, chunk = args
+    return [func(rec) for rec in chunk]
+
+
+def _filter_chunk(args):
+    """Aux Function: evaluate func on a chunk of records
+
+    Only the boolean mask is sent back to the parent process, which holds
+    the records already.
+    """
+    func, chunk = args
+    return np.array([bool(func(rec)) for rec in chunk], dtype=bool)
+
+
+def _iter_results(worker, func, records, n_jobs, chunksize):
+    """Aux Function: yield the results of worker chunk by chunk, in order"""
+    if chunksize < 1:
+        raise ValueError('chunksize must be positive, got %s' % chunksize)
+    tasks = ((func, chunk) for chunk in _get_chunks(records, chunksize))
+    return _parallel_imap(worker, tasks, n_jobs)
+
+
+def parallel_map(records, func, n_jobs=1, chunksize=1000, dtype=None):
+    """Apply a function to each record using a pool of processes
+
+    Parameters
+    ----------
+    records : iterable of pymed.PubmedRecord
+        The records.
+    func : callable
+        The function applied to each record. If n_jobs > 1, it must be
+        picklable, i.e., defined at the top level of a module.
+    n_jobs : int
+        The number of processes. If -1, all CPUs are used.
+    chunksize : int
+        The number of records sent to a process at once. Larger chunks
+        reduce the communication overhead.
+    dtype : numpy dtype | None
+        If not None, the results are returned as array of this type.
+
+    Returns
+    -------
+    results : list | ndarray | instance of pymed.Records
+        The results in the order of the records. If func returns instances
+        of PubmedRecord, the results are returned as Records.
+    """
+    from .pymed import PubmedRecord, Records
+    results = []
+    for out in _iter_results(_map_chunk, func, records, n_jobs, chunksize):
+        results.extend(out)
+    if dtype is not None:
+        return np.array(results, dtype=dtype)
+    if results and all(isinstance(r, PubmedRecord) for r in results):
+        return Records(results)
+    return results
+
+
+def parallel_filter(records, func, n_jobs=1, chunksize=1000):
+    """Select the records for which a function is true using processes
+
+    Parameters
+    ----------
+    records : list-like of pymed.PubmedRecord
+        The records.
+    func : callable
+        The predicate evaluated on each record. If n_jobs > 1, it must be
+        picklable, i.e., defined at the top level of a module.
+    n_jobs : int
+        The number of processes. If -1, all CPUs are used.
+    chunksize : int
+        The number of records sent to a process at once.
+
+    Returns
+    -------
+    records : instance of pymed.Records
+        The selected records, in their original order.
+    """
+    from .pymed import Records
+    masks = list(_iter_results(_filter_chunk, func, records, n_jobs,
+                               chunksize))
+    mask = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+    return Records(rec for rec, keep in zip(records, mask) if keep)
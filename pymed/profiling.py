@@ -0,0 +1,293 @@
+"""Profile the time and memory spent in Records operations"""
+
+# License: BSD (3-clause)
+
+import functools
+import inspect
+import sys
+import threading
+from collections import defaultdict
+from timeit import default_timer
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+# the methods and functions wrapped while profiling
+PROFILED_METHODS = {
+    'Records': ['find', 'drop', 'copy', 'extend', 'save', 'save_as_bibtex',
+                'save_as_nbib', 'save_as_ris', 'save_as_csljson',
+                'save_as_endnote', 'describe', 'dates', 'dois', 'to_matrix',
+                'near_duplicates', 'link_graph', 'parallel_map',
+                'parallel_filter'],
+    'PubmedRecord': ['as_corpus', 'to_ascii', 'match', 'to_nbib',
+                     'to_bibtex', 'get_doi'],
+}
+PROFILED_FUNCTIONS = ['read_records', 'write_records', 'query_records',
+                      'read_pubmed_xml']
+SORT_KEYS = ('cumtime', 'tottime', 'calls', 'memory', 'blocks', 'name')
+
+_active = []
+
+
+class _Stats(object):
+    """Aux Class: the statistics of a profiled method"""
+    __slots__ = ('calls', 'cumtime', 'tottime', 'memory', 'blocks')
+
+    def __init__(self):
+        self.calls = 0
+        self.cumtime = 0.
+        self.tottime = 0.
+        self.memory = 0
+        self.blocks = 0
+
+
+class Profiler(object):
+    """Collect call counts, times and memory of Records operations
+
+    Use `pymed.profile` to create instances.
+
+    Memory is attributed from a snapshot of all memory blocks of the
+    process still allocated when profiling stops: a block is charged to
+    each profiled method found in the call stack that allocated it,
+    whichever thread made the call. Memory freed before profiling stops
+    is not reported.
+
+    Parameters
+    ----------
+    trace_memory : bool
+        If True, memory allocations are traced with tracemalloc, which
+        slows down the profiled code. Not available on Python 2.
+    n_sites : int
+        The number of allocation sites reported.
+    n_frames : int
+        The number of frames stored per allocation. Blocks allocated deeper
+        below a profiled method are not charged to it. Ignored if
+        tracemalloc was started before profiling.
+
+    Attributes
+    ----------
+    stats : dict
+        The statistics of each method, keyed by name, e.g. 'Records.find'.
+        `calls` is the number of calls, `cumtime` the time spent in the
+        method including profiled methods it calls, `tottime` the time
+        excluding them, `memory` the size in bytes and `blocks` the number
+        of the memory blocks allocated by the method, including the
+        methods it calls, and still allocated when profiling stopped.
+    stacks : dict
+        The time excluding profiled sub-calls in seconds, keyed by call
+        stack, e.g. ('read_records', 'Records.extend').
+    allocations : list of tuple
+        The allocation sites with most memory still allocated when
+        profiling stopped, as (site, n_blocks, size in bytes).
+    """
+    def __init__(self, trace_memory=True, n_sites=10, n_frames=16):
+        self.trace_memory = trace_memory and tracemalloc is not None
+        self.n_sites = n_sites
+        self.n_frames = n_frames
+        self.stats = defaultdict(_Stats)
+        self.stacks = defaultdict(float)
+        self.allocations = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._patched = []
+        self._started_tracing = False
+
+    def __enter__(self):
+        if _active:
+            raise RuntimeError('Profiling is already active.')
+        _active.append(self)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.n_frames)
+            self._started_tracing = True
+        self._patch()
+        return self
+
+    def __exit__(self, *args):
+        functions = [(name, func) for _, _, func, name in self._patched]
+        self._unpatch()
+        if self.trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            self.allocations = [
+                (str(stat.traceback), stat.count, stat.size)
+                for stat in snapshot.statistics('lineno')[:self.n_sites]]
+            if self._started_tracing:
+                tracemalloc.stop()
+            self._attribute_memory(snapshot, functions)
+        _active.remove(self)
+
+    def _attribute_memory(self, snapshot, functions):
+        """Aux Function: charge the allocated blocks to profiled methods"""
+        lines = defaultdict(set)  # the lines of each method, by file
+        for name, func in functions:
+            try:
+                source, first = inspect.getsourcelines(func)
+            except (IOError, TypeError):
+                continue
+            code = func.__code__
+            lines[code.co_filename].add((first, first + len(source), name))
+        frames = {}  # the methods of each frame
+        for stat in snapshot.statistics('traceback'):
+            names = set()
+            for frame in stat.traceback:
+                key = frame.filename, frame.lineno
+                if key not in frames:
+                    frames[key] = [name for first, last, name in
+                                   lines.get(frame.filename, ())
+                                   if first <= frame.lineno < last]
+                names.update(frames[key])
+            for name in names:
+                if name in self.stats:
+                    self.stats[name].memory += stat.size
+                    self.stats[name].blocks += stat.count
+
+    def _patch(self):
+        """Aux Function: wrap the profiled methods and functions"""
+        from . import pymed as module
+        package = sys.modules[__name__.rsplit('.', 1)[0]]
+        for cls_name, names in PROFILED_METHODS.items():
+            cls = getattr(module, cls_name)
+            for name in names:
+                self._replace(cls, name, '%s.%s' % (cls_name, name))
+        for name in PROFILED_FUNCTIONS:
+            for namespace in (module, package):
+                if hasattr(namespace, name):
+                    self._replace(namespace, name, name)
+
+    def _replace(self, owner, attr, name):
+        """Aux Function: replace an attribute by its profiled version"""
+        func = owner.__dict__[attr]
+        setattr(owner, attr, self._wrap(func, name))
+        self._patched.append((owner, attr, func, name))
+
+    def _unpatch(self):
+        """Aux Function: restore the original methods and functions"""
+        for owner, attr, func, _ in reversed(self._patched):
+            setattr(owner, attr, func)
+        self._patched = []
+
+    def _wrap(self, func, name):
+        """Aux Function: record the time of each call"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = getattr(self._local, 'stack', None)
+            if stack is None:
+                stack = self._local.stack = []
+            frame = [name, 0.]  # the name and the time of sub-calls
+            stack.append(frame)
+            t0 = default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = default_timer() - t0
+                stack.pop()
+                with self._lock:  # the statistics are shared by threads
+                    stats = self.stats[name]
+                    stats.calls += 1
+                    # recursive calls are only counted once
+                    if all(f[0] != name for f in stack):
+                        stats.cumtime += elapsed
+                    stats.tottime += elapsed - frame[1]
+                    self.stacks[tuple(f[0] for f in stack) + (name,)] += \
+                        elapsed - frame[1]
+                if stack:
+                    stack[-1][1] += elapsed
+        return wrapper
+
+    def report(self, sort='cumtime', n_max=None):
+        """Summarize the statistics as text
+
+        Parameters
+        ----------
+        sort : str
+            The column to sort by, one of 'cumtime', 'tottime', 'calls',
+            'memory', 'blocks' or 'name'.
+        n_max : int | None
+            The maximum number of methods to report. If None, all methods
+            called are reported.
+
+        Returns
+        -------
+        report : str
+            The table of statistics, followed by the main allocation sites
+            if memory was traced.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError('sort must be one of %s, got %s.'
+                             % (', '.join(SORT_KEYS), sort))
+        items = sorted(self.stats.items(), key=lambda x: x[0])
+        if sort != 'name':
+            items.sort(key=lambda x: getattr(x[1], sort), reverse=True)
+        out = ['%-28s %8s %12s %12s %12s %8s' % (
+            'name', 'calls', 'cumtime (s)', 'tottime (s)', 'memory (kB)',
+            'blocks')]
+        for name, stats in items[:n_max]:
+            memory = ('%12.1f %8i' % (stats.memory / 1024., stats.blocks)
+                      if self.trace_memory else '%12s %8s' % ('-', '-'))
+            out.append('%-28s %8i %12.4f %12.4f %s' % (
+                name, stats.calls, stats.cumtime, stats.tottime, memory))
+        if self.allocations:
+            out.extend(['', 'Top allocation sites (blocks, kB):'])
+            for site, count, size in self.allocations:
+                out.append('%s: %i, %.1f' % (site, count, size / 1024.))
+        return '\n'.join(out)
+
+    def to_folded(self):
+        """Export the call stacks in the folded format of flame graphs
+
+        Each line contains a call stack separated by semicolons and the
+        time spent in its last frame in microseconds, e.g.
+        'read_records;Records.extend 1200', as read by flamegraph.pl or
+        speedscope.
+
+        Returns
+        -------
+        folded : str
+            The call stacks.
+        """
+        return ''.join('%s %i\n' % (';'.join(stack), round(value * 1e6))
+                       for stack, value in sorted(self.stacks.items()))
+
+    def save_folded(self, fname):
+        """Save the call stacks in the folded format of flame graphs
+
+        Parameters
+        ----------
+        fname : str
+            The name of the file.
+        """
+        with open(fname, 'w') as fid:
+            fid.write(self.to_folded())
+
+
+def profile(trace_memory=True, n_sites=10, n_frames=16):
+    """Profile Records operations
+
+    While active, the main methods of Records and PubmedRecord as well as
+    reading, writing and downloading functions are timed. Calls made from
+    several threads are aggregated, calls made in worker processes, e.g.
+    with n_jobs > 1, are not profiled. Memory is attributed from a
+    snapshot of the whole process, see Profiler.
+
+    Parameters
+    ----------
+    trace_memory : bool
+        If True, memory allocations are traced with tracemalloc, which
+        slows down the profiled code. Not available on Python 2.
+    n_sites : int
+        The number of allocation sites reported.
+    n_frames : int
+        The number of frames stored per allocation.
+
+    Returns
+    -------
+    profiler : instance of pymed.profiling.Profiler
+        The context manager collecting the statistics, e.g.
+
+        >>> with pymed.profile() as prof:  # doctest: +SKIP
+        ...     recs.find('brain').save_as_nbib('brain')
+        >>> print(prof.report())  # doctest: +SKIP
+    """
+    return Profiler(trace_memory=trace_memory, n_sites=n_sites,
+                    n_frames=n_frames)
@@ -0,0 +1,287 @@
+"""Read PubMed XML, e.g., the annual baseline and the daily update files"""
+
+# License: BSD (3-clause)
+
+import gzip
+from collections import OrderedDict
+
+from .utils import _parallel_imap
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep',
+          'Oct', 'Nov', 'Dec']
+
+# RefType of CommentsCorrections and the corresponding Medline tags
+COMMENTS_CORRECTIONS = {
+    'CommentOn': 'CON', 'CommentIn': 'CIN',
+    'ErratumIn': 'EIN', 'ErratumFor': 'EFR',
+    'CorrectedandRepublishedIn': 'CRI', 'CorrectedandRepublishedFrom': 'CRF',
+    'PartialRetractionIn': 'PRIN', 'PartialRetractionOf': 'PROF',
+    'RepublishedIn': 'RPI', 'RepublishedFrom': 'RPF',
+    'RetractionIn': 'RIN', 'RetractionOf': 'ROF',
+    'UpdateIn': 'UIN', 'UpdateOf': 'UOF',
+    'SummaryForPatientsIn': 'SPIN', 'OriginalReportIn': 'ORI'}
+
+# PubStatus of PubMedPubDate and the corresponding Medline tags
+HISTORY_DATES = {'pubmed': 'EDAT', 'medline': 'MHDA', 'entrez': 'CRDT'}
+
+
+def _text(elem):
+    """Aux Function: the text of an element including inline markup"""
+    if elem is None:
+        return None
+    return ''.join(elem.itertext()).strip() or None
+
+
+def _ymd(elem):
+    """Aux Function: Year, Month and Day children as YYYYMMDD"""
+    if elem is None:
+        return None
+    return ''.join(elem.findtext(k, '').zfill(2) for k in
+                   ('Year', 'Month', 'Day'))
+
+
+def _pub_date(elem):
+    """Aux Function: PubDate as in the DP tag, e.g. '2013 Mar 11'"""
+    if elem is None:
+        return None
+    medline_date = elem.findtext('MedlineDate')
+    if medline_date:
+        return medline_date
+    month = elem.findtext('Month', '')
+    if month.isdigit():
+        month = MONTHS[int(month) - 1]
+    parts = [elem.findtext('Year'), elem.findtext('Season') or month,
+             elem.findtext('Day', '').lstrip('0')]
+    return ' '.join(p for p in parts if p)
+
+
+def _history_date(elem):
+    """Aux Function: PubMedPubDate as in the EDAT tag"""
+    return '%s/%s/%s %s:%s' % tuple(
+        elem.findtext(k, '0').zfill(2) for k in
+        ('Year', 'Month', 'Day', 'Hour', 'Minute'))
+
+
+def _mesh_heading(elem):
+    """Aux Function: MeshHeading as in the MH tag, e.g. 'Brain/*pathology'"""
+    def name(e):
+        return ('*' if e.get('MajorTopicYN') == 'Y' else '') + e.text
+    return '/'.join([name(elem.find('DescriptorName'))] +
+                    [name(q) for q in elem.findall('QualifierName')])
+
+
+def _add(rec, key, value):
+    """Aux Function: set non-empty values"""
+    if value:
+        rec[key] = value
+
+
+def _parse_article(elem):
+    """Aux Function: convert a PubmedArticle element to Medline tags"""
+    rec = {}
+    citation = elem.find('MedlineCitation')
+    article = citation.find('Article')
+    journal = article.find('Journal')
+    issue = journal.find('JournalIssue')
+    info = citation.find('MedlineJournalInfo')
+    pubmed_data = elem.find('PubmedData')
+
+    _add(rec, 'PMID', citation.findtext('PMID'))
+    _add(rec, 'OWN', citation.get('Owner'))
+    _add(rec, 'STAT', citation.get('Status'))
+    _add(rec, 'DA', _ymd(citation.find('DateCreated')))
+    _add(rec, 'DCOM', _ymd(citation.find('DateCompleted')))
+    _add(rec, 'LR', _ymd(citation.find('DateRevised')))
+    issn = ['%s (%s)' % (e.text, e.get('IssnType'))
+            for e in journal.findall('ISSN')]
+    issn += ['%s (Linking)' % e.text for e in info.findall('ISSNLinking')]
+    _add(rec, 'IS', ' '.join(issn))
+    _add(rec, 'VI', issue.findtext('Volume'))
+    _add(rec, 'IP', issue.findtext('Issue'))
+    _add(rec, 'DP', _pub_date(issue.find('PubDate')))
+    _add(rec, 'TI', _text(article.find('ArticleTitle')))
+    _add(rec, 'PG', article.findtext('Pagination/MedlinePgn'))
+    _add(rec, 'LID', ' '.join('%s [%s]' % (e.text, e.get('EIdType'))
+                              for e in article.findall('ELocationID')))
+    abstract = []
+    for e in article.findall('Abstract/AbstractText'):
+        label = e.get('Label')
+        abstract.append(('%s: ' % label if label else '') + (_text(e) or ''))
+    _add(rec, 'AB', ' '.join(abstract))
+    _add(rec, 'CI', [e.text for e in
+                     article.findall('Abstract/CopyrightInformation')])
+
+    fau, au, cn, ad = [], [], [], []
+    for author in article.findall('AuthorList/Author'):
+        if author.find('CollectiveName') is not None:
+            cn.append(_text(author.find('CollectiveName')))
+            continue
+        last, fore = author.findtext('LastName'), author.findtext('ForeName')
+        initials = author.findtext('Initials')
+        fau.append(', '.join(n for n in (last, fore) if n))
+        au.append(' '.join(n for n in (last, initials) if n))
+        for e in author.findall('AffiliationInfo/Affiliation'):
+            if e.text not in ad:
+                ad.append(e.text)
+    _add(rec, 'FAU', fau)
+    _add(rec, 'AU', au)
+    _add(rec, 'CN', cn)
+    _add(rec, 'AD', ad)
+    _add(rec, 'LA', [e.text for e in article.findall('Language')])
+    _add(rec, 'GR', ['/'.join(e.findtext(k) for k in
+                              ('GrantID', 'Agency', 'Country')
+                              if e.findtext(k))
+                     for e in article.findall('GrantList/Grant')])
+    _add(rec, 'PT', [e.text for e in
+                     article.findall('PublicationTypeList/PublicationType')])
+    _add(rec, 'DEP', _ymd(article.find("ArticleDate[@DateType='Electronic']")))
+    _add(rec, 'PL', info.findtext('Country'))
+    _add(rec, 'TA', info.findtext('MedlineTA') or
+         journal.findtext('ISOAbbreviation'))
+    _add(rec, 'JT', journal.findtext('Title'))
+    _add(rec, 'JID', info.findtext('NlmUniqueID'))
+    _add(rec, 'RN', ['%s (%s)' % (e.findtext('RegistryNumber'),
+                                  e.findtext('NameOfSubstance'))
+                     for e in citation.findall('ChemicalList/Chemical')])
+    _add(rec, 'SB', [e.text for e in citation.findall('CitationSubset')])
+    for e in citation.findall('CommentsCorrectionsList/CommentsCorrections'):
+        tag = COMMENTS_CORRECTIONS.get(e.get('RefType'))
+        if tag is not None:
+            value, pmid = e.findtext('RefSource'), e.findtext('PMID')
+            if pmid:
+                value = '%s. PMID: %s' % (value.rstrip('.'), pmid)
+            rec.setdefault(tag, []).append(value)
+    _add(rec, 'MH', [_mesh_heading(e) for e in
+                     citation.findall('MeshHeadingList/MeshHeading')])
+    _add(rec, 'OT', [_text(e) for e in
+                     citation.findall('KeywordList/Keyword')])
+
+    if pubmed_data is not None:
+        phst = []
+        for e in pubmed_data.findall('History/PubMedPubDate'):
+            status, date = e.get('PubStatus'), _history_date(e)
+            phst.append('%s [%s]' % (date[:10], status))
+            tag = HISTORY_DATES.get(status)
+            if tag == 'CRDT':
+                rec[tag] = [date[:16]]
+            elif tag is not None:
+                rec[tag] = date[:16]
+        _add(rec, 'PHST', phst)
+        _add(rec, 'PST', pubmed_data.findtext('PublicationStatus'))
+        ids = pubmed_data.findall('ArticleIdList/ArticleId')
+        _add(rec, 'AID', ['%s [%s]' % (e.text, e.get('IdType')) for e in ids
+                          if e.get('IdType') not in ('pubmed', 'pmc')])
+        _add(rec, 'PMC', ' '.join(e.text for e in ids
+                                  if e.get('IdType') == 'pmc'))
+
+    source = '%s. %s' % (rec.get('TA', ''), rec.get('DP', ''))
+    if 'VI' in rec:
+        source += ';%s' % rec['VI']
+    if 'IP' in rec:
+        source += '(%s)' % rec['IP']
+    if 'PG' in rec:
+        source += ':%s' % rec['PG']
+    rec['SO'] = source + '.'
+    return rec
+
+
+def _iter_file(fname):
+    """Aux Function: stream the records and deleted PMIDs of a file
+
+    Processed elements are cleared from the tree, so memory use does not
+    grow with the size of the file. The PMIDs of DeleteCitation entries
+    are yielded as strings.
+    """
+    try:
+        import xml.etree.cElementTree as ElementTree
+    except ImportError:
+        import xml.etree.ElementTree as ElementTree
+    from .pymed import PubmedRecord
+    open_ = gzip.open if fname.endswith('.gz') else open
+    with open_(fname, 'rb') as fid:
+        context = ElementTree.iterparse(fid, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event != 'end':
+                continue
+            if elem.tag == 'PubmedArticle':
+                yield PubmedRecord(_parse_article(elem))
+                root.clear()
+            elif elem.tag == 'DeleteCitation':
+                for pmid in elem.findall('PMID'):
+                    yield pmid.text.strip()
+                root.clear()
+
+
+def _read_file(fname):
+    """Aux Function: read all records of a file, used by worker processes"""
+    return list(_iter_file(fname))
+
+
+def iter_pubmed_xml(fnames, n_jobs=1, deletions=False):
+    """Stream records from PubMed XML files
+
+    Parameters
+    ----------
+    fnames : str | list of str
+        The files, e.g., 'pubmed24n0001.xml.gz'. Files ending with '.gz'
+        are decompressed on the fly.
+    n_jobs : int
+        The number of processes reading files in parallel. If 1, records
+        are parsed one by one while iterating. Otherwise, each process
+        parses a whole file at once. If -1, all CPUs are used.
+    deletions : bool
+        If True, the PubMed IDs listed in DeleteCitation entries of update
+        files are yielded as strings, in the order of the files, so callers
+        can remove these records. If False, they are skipped.
+
+    Returns
+    -------
+    records : generator of pymed.PubmedRecord
+        The records in the order of the files. Revised citations of update
+        files are yielded as they come, next to earlier versions; use
+        `read_pubmed_xml` to keep only the latest version of each record.
+    """
+    from .pymed import PubmedRecord
+    if not isinstance(fnames, (list, tuple)):
+        fnames = [fnames]
+    if n_jobs == 1:
+        items = (item for fname in fnames for item in _iter_file(fname))
+    else:
+        items = (item for items in _parallel_imap(_read_file, fnames, n_jobs)
+                 for item in items)
+    for item in items:
+        if deletions or isinstance(item, PubmedRecord):
+            yield item
+
+
+def read_pubmed_xml(fnames, n_jobs=1):
+    """Read records from PubMed XML files
+
+    The files are applied in order, as the PubMed baseline followed by its
+    update files: a record read again replaces the earlier version in
+    place, and records listed in DeleteCitation entries are removed.
+
+    Parameters
+    ----------
+    fnames : str | list of str
+        The files, e.g., the PubMed baseline. Files ending with '.gz' are
+        decompressed on the fly.
+    n_jobs : int
+        The number of processes reading files in parallel. If -1, all CPUs
+        are used.
+
+    Returns
+    -------
+    recs : instance of pymed.Records
+        The records, with the same tags as records downloaded in Medline
+        format.
+    """
+    from .pymed import PubmedRecord, Records
+    records = OrderedDict()
+    for item in iter_pubmed_xml(fnames, n_jobs=n_jobs, deletions=True):
+        if isinstance(item, PubmedRecord):
+            records[item.get('PMID') or object()] = item
+        else:
+            records.pop(item, None)
+    return Records(records.values())
@@ -3,39 +3,50 @@
 #
 # License: BSD (3-clause)
 
+import datetime
+import io
 import json
 import re
 import textwrap
+import threading
+import time
+from collections import Counter, namedtuple
 from copy import deepcopy
 from .constants import PMD
 
-from Bio import Entrez, Medline
+# Biopython, numpy, urllib and the export, text mining and network layers
+# are imported on first use, so that reading saved records is fast.
 
 try:
     from itertools import izip_longest
 except ImportError:
     from itertools import zip_longest as izip_longest
-try:
-    # For Python 3.0 and later
-    from urllib.request import urlopen
-    from urllib.error import HTTPError
-except ImportError:
-    # Fall back to Python 2's urllib2
-    from urllib2 import urlopen, HTTPError
 
 DOI_REGEX = '(10\\.\\d{4,6}/[^"\'&<% \t\n\r\x0c\x0b]+)'
 DOI_ORG = 'http://dx.doi.org/'
+EUTILS_URL = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+
+_EUTILS_LOCK = threading.Lock()
+_last_request = [0.]  # the time of the last E-utilities request
+
+DOI_PATTERN = re.compile(DOI_REGEX)
+# e.g. AID '10.1002/mrm.24680 [doi]' or LID 'S1090-7807(13)00028-1 [pii]
+# 10.1016/j.jmr.2013.01.014 [doi]'
+_DOI_TAGGED = re.compile(DOI_REGEX + r'\s*\[doi\]')
+_DOI_PREFIX = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', re.I)
+DOI_FIELDS = ('AID', 'LID', 'SO')
+_NOT_CACHED = object()
 
-BIBTEX_TMP = r"""
-@%(PT)s{%(KEY)s,
-Author = {%(AU)s},
-Title = {%(TI)s},
-Year = {%(YR)s},
-Journal = {%(JN)s},
-Number = {%(NU)s},
-Pages = {%(PG)s},
-Volume = {%(VOL)s}}
-"""
+MONTHS = dict((m, i + 1) for i, m in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun',
+     'jul', 'aug', 'sep', 'oct', 'nov', 'dec']))
+
+# e.g. '20130315' or '2013/03/16 06:00'
+_DATE_NUMERIC = re.compile(r'^(\d{4})(?:([/-]?)(\d{2})(?:\2(\d{2}))?)?(?!\d)')
+# e.g. '2013 Mar 11', '2012 Aug', '2011 Nov-Dec'
+_DATE_TEXT = re.compile(r'^(\d{4})\s+([A-Za-z]+)(?:\s+(\d{1,2}))?(?!\d)')
+
+PubDate = namedtuple('PubDate', ['year', 'month', 'day', 'precision'])
 
 
 def read_records(fname):
@@ -81,66 +92,95 @@ def write_records(records, fname, mode='w', indent=None,
               separators=separators)
 
 
-def _bibtex_get_author(author_list):
-    """Aux Function"""
-    out = []
-    for author in author_list:
-        names = author.split(' ')
-        if len(names) == 2:
-            name, surname = names
-        elif len(names) >= 2:
-            name = ' '.join(names[:len(names) - 1])
-            surname = names[-1]
-        out += ['%s, %s' % (name, '.'.join(surname))]
-
-    return ' and '.join(out)
-
+def _parse_date(value):
+    """Aux Function: parse a Medline date into an instance of PubDate
 
-def _bibtex_make_id(author, journal, year):
-    """Aux Function"""
-    fmt = (''.join(c for c in author[0].split(' ')[0].lower() if c.isalpha()),
-           str(year))
-    return ':'.join(fmt)
+    Precision is one of 'year', 'month' or 'day'. Seasons and unknown
+    month names fall back to year precision. None is returned if the
+    value does not start with a year.
+    """
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if not value:
+        return None
+    match = _DATE_TEXT.match(value)
+    if match is not None:
+        year, month, day = match.group(1, 2, 3)
+        month = MONTHS.get(month[:3].lower())
+    else:
+        match = _DATE_NUMERIC.match(value)
+        if match is None:
+            return None
+        year, month, day = match.group(1, 3, 4)
+        month = int(month) if month else None
+    year = int(year)
+    if month is None or not 1 <= month <= 12:
+        return PubDate(year, None, None, 'year')
+    day = int(day) if day else None
+    try:
+        datetime.date(year, month, day)
+    except (TypeError, ValueError):  # no day or e.g. '2013 Feb 30'
+        return PubDate(year, month, None, 'month')
+    return PubDate(year, month, day, 'day')
 
 
-def _bibtex_get_pages(pages_str):
-    """Aux Function"""
-    if PMD.SEP_PAGES_ENTRY in pages_str:
-        pages_str = pages_str.split(PMD.SEP_PAGES_ENTRY)[0]
-    if '-' in pages_str:
-        pfrom, pto = [int(k) for k in pages_str.split(PMD.SEP_PAGES_RANGE)]
-        if pfrom > pto:
-            pto += pfrom
-        pages_str = PMD.SEP_PAGES_RANGE.join([str(k) for k in [pfrom, pto]])
+def _make_chunks(n, iterable, padvalue=None):
+    """Aux Function: create chunks"""
+    return izip_longest(*[iter(iterable)] * n, fillvalue=padvalue)
 
-    return pages_str
 
+def normalize_doi(doi):
+    """Normalize a DOI for comparison
 
-def _bibtex_get_publication_type(ins):
-    """Aux Function"""
-    out = 'article'
-    # XXX currently only article supported.
-    return out
+    DOIs are case insensitive, hence they are lower-cased. URL and 'doi:'
+    prefixes as well as trailing punctuation are removed.
 
+    Parameters
+    ----------
+    doi : str
+        The DOI, e.g., 'https://doi.org/10.1002/MRM.24680'.
 
-def _make_chunks(n, iterable, padvalue=None):
-    """Aux Function: create chunks"""
-    return izip_longest(*[iter(iterable)] * n, fillvalue=padvalue)
+    Returns
+    -------
+    doi : str
+        The normalized DOI, e.g., '10.1002/mrm.24680'.
+    """
+    return _DOI_PREFIX.sub('', doi.strip()).rstrip('.,;').lower()
 
 
 def _get_doi(rec):
-    """Aux Function"""
-    doi = rec.get('AID', rec.get('SO',  rec.get('LID', None)))
-    if isinstance(doi, list):
-        doi = ''.join([d for d in doi if 'doi' in d])
-    if doi is not None:
-        res = re.findall(DOI_REGEX, doi)
+    """Aux Function: extract the DOI of a record
+
+    Article IDs (AID) marked as doi take precedence over the location ID
+    (LID), which takes precedence over the source (SO).
+    """
+    for field, pattern in (('AID', _DOI_TAGGED), ('LID', _DOI_TAGGED),
+                           ('SO', DOI_PATTERN)):
+        value = rec.get(field)
+        if not value:
+            continue
+        if isinstance(value, list):
+            value = ' '.join(value)
+        res = pattern.search(value)
         if res:
-            return res[0]
+            return res.group(1).rstrip('.,;')
+
+
+def _get_urllib():
+    """Aux Function: import urlopen and the URL errors on first use"""
+    try:
+        # For Python 3.0 and later
+        from urllib.request import urlopen
+        from urllib.error import HTTPError, URLError
+    except ImportError:
+        # Fall back to Python 2's urllib2
+        from urllib2 import urlopen, HTTPError, URLError
+    return urlopen, HTTPError, URLError
 
 
 def resolve_doi(rec):
     """Resolve the doi of a given record"""
+    urlopen, HTTPError, _ = _get_urllib()
     doi = _get_doi(rec)
     if doi is not None:
         res = None
@@ -151,14 +191,12 @@ def resolve_doi(rec):
         return res.url
 
 
-def _export_records(records, fname, end, method):
-    """Aux Function"""
-    if not fname.endswith(end):
-        fname += end
-    with open(fname, 'w') as fd:
-        for ii, rec in enumerate(records):
-            if ii not in records.exclude_:
-                fd.write(getattr(rec, method)())
+def _rebuild_record(cls, mapping, dates):
+    """Aux Function: unpickle records without parsing dates again"""
+    rec = dict.__new__(cls)
+    dict.update(rec, mapping)
+    rec._dates = dates
+    return rec
 
 
 class PubmedRecord(dict):
@@ -168,12 +206,25 @@ class PubmedRecord(dict):
     As keys in a dict and can be used with set functions. This is useful
     when dealing with a larger number of records.
 
+    Dates (see PMD.DATE_FIELDS) are parsed once, when the corresponding
+    field is set, and stored as instances of PubDate.
+
     Attributes
     ----------
     pubmed_id : str
         The PubMed ID of the record.
     year : int
         The year of the publication.
+    pub_date : instance of PubDate | None
+        The date of publication (DP).
+    entrez_date : instance of PubDate | None
+        The date the record was added to PubMed (EDAT).
+    create_date : instance of PubDate | None
+        The date the record was created (DA).
+    revision_date : instance of PubDate | None
+        The date the record was last revised (LR).
+    epub_date : instance of PubDate | None
+        The date of electronic publication (DEP).
 
     Methods
     -------
@@ -191,9 +242,68 @@ class PubmedRecord(dict):
         Get the internet location for the article.
     """
     def __init__(self, mapping):
+        self._dates = {}
         for k, v in mapping.items():
+            self._set(k, v)
+
+    def __setitem__(self, key, value):
+        self._set(key, value)
+        _n_edits[0] += 1
+
+    def _set(self, key, value):
+        """Aux method: set a field and update the parsed values"""
+        dict.__setitem__(self, key, value)
+        if key in DOI_FIELDS:
+            self.__dict__.pop('_doi', None)
+        if key in PMD.DATE_FIELDS:
+            date = _parse_date(value)
+            if date is None:
+                self._dates.pop(key, None)
+            else:
+                self._dates[key] = date
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._dates.pop(key, None)
+        self.__dict__.pop('_doi', None)
+        _n_edits[0] += 1
+
+    def pop(self, key, *args):
+        self._dates.pop(key, None)
+        self.__dict__.pop('_doi', None)
+        _n_edits[0] += 1
+        return dict.pop(self, key, *args)
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
             self[k] = v
 
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._dates.pop(key, None)
+        self.__dict__.pop('_doi', None)
+        _n_edits[0] += 1
+        return key, value
+
+    def clear(self):
+        dict.clear(self)
+        self._dates.clear()
+        self.__dict__.pop('_doi', None)
+        _n_edits[0] += 1
+
+    def __reduce__(self):
+        return _rebuild_record, (self.__class__, dict(self),
+                                 dict(self._dates))
+
     def as_corpus(self, fields=None):
         """Return record as single string.
 
@@ -211,7 +321,7 @@ class PubmedRecord(dict):
         corpus = []
         if fields is None:
             fields = ('TI', 'AU', 'AB')
-        for k, v in self.iteritems():
+        for k, v in self.items():
             if isinstance(v, list):
                 v = ', '.join(v)
             if any([k in fields,
@@ -270,16 +380,8 @@ class PubmedRecord(dict):
         nbib_record : str
             The record in Medline format.
         """
-        out = '\n\nPMID- ' + self.pubmed_id
-        for k, v in self.items():
-            if not k == 'PMID':
-                if len(k) < 4:
-                    k += (' ' * (4 - len(k)))
-                if isinstance(v, list):
-                    v = ' '.join(v)
-                v = textwrap.fill(v, subsequent_indent=(' ' * 6))
-                out += '\n' + '- '.join([k, v])
-        return out
+        from .export import format_nbib
+        return format_nbib(self)
 
     def to_bibtex(self):
         """Export record in BibTex format
@@ -289,19 +391,8 @@ class PubmedRecord(dict):
         bibtex_record : str
             The record in BibTex format.
         """
-        fmt = {
-            'PT': _bibtex_get_publication_type(self.get('PT', 'NA')),
-            'KEY': _bibtex_make_id(self.get('AU', ''), self.get('JT', 'NA'),
-                                   self.year),
-            'AU': _bibtex_get_author(self.get('AU', 'NA')),
-            'TI': self.get('TI', 'NA'),
-            'JN': self.get('JT', 'NA').replace('&', '\&'),
-            'YR': '%s' % self.year,
-            'NU': self.get('IP', 'NA'),
-            'VOL': self.get('IV', 'NA'),
-            'PG': self.get('PG', 'NA')
-        }
-        return BIBTEX_TMP % fmt
+        from .export import format_bibtex
+        return format_bibtex(self)
 
     def get_pdf(self):
         """Find and download the associated PDF"""
@@ -316,7 +407,10 @@ class PubmedRecord(dict):
             The doi associated with the record. If not available,
             None is returned.
         """
-        return _get_doi(self)
+        doi = self.__dict__.get('_doi', _NOT_CACHED)
+        if doi is _NOT_CACHED:
+            doi = self._doi = _get_doi(self)
+        return doi
 
     def resolve_doi(self):
         """ Get address from doi
@@ -329,17 +423,147 @@ class PubmedRecord(dict):
         """
         return self.get('PMID', None)
 
+    def get_date(self, field='DP'):
+        """Get parsed date
+
+        Parameters
+        ----------
+        field : str
+            The date field, one of PMD.DATE_FIELDS.
+
+        Returns
+        -------
+        date : instance of PubDate | None
+            The year, month, day and precision of the date. If not
+            available, None is returned.
+        """
+        if field not in PMD.DATE_FIELDS:
+            raise ValueError('%s is not a date field. Please use one of %s'
+                             % (field, ', '.join(PMD.DATE_FIELDS)))
+        return self._dates.get(field)
+
     @property
     def year(self):
         """ The year of the publication
         """
-        dp = self.get('DP')
-        return int(dp[:4]) if dp else dp
+        date = self._dates.get('DP')
+        return date.year if date is not None else None
+
+    @property
+    def pub_date(self):
+        """ The date of publication
+        """
+        return self._dates.get('DP')
+
+    @property
+    def entrez_date(self):
+        """ The date the record was added to PubMed
+        """
+        return self._dates.get('EDAT')
+
+    @property
+    def create_date(self):
+        """ The date the record was created
+        """
+        return self._dates.get('DA')
+
+    @property
+    def revision_date(self):
+        """ The date the record was last revised
+        """
+        return self._dates.get('LR')
+
+    @property
+    def epub_date(self):
+        """ The date of electronic publication
+        """
+        return self._dates.get('DEP')
 
     def __hash__(self):
         return self.pubmed_id.__hash__()
 
 
+def _counter_discard(counter, key):
+    """Aux Function: decrement a counter and drop exhausted keys"""
+    if key in counter:
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+
+# the number of in-place edits of records, see _RecordsSummary
+_n_edits = [0]
+
+
+class _RecordsSummary(object):
+    """Running aggregates over a collection of records
+
+    The aggregates are updated incrementally whenever a record enters or
+    leaves the collection, hence summarizing never requires a pass over
+    the records. Editing a record in place, which the collection cannot
+    observe, outdates the aggregates; they are then recomputed once when
+    used next, see Records._get_summary.
+    """
+    def __init__(self, records=()):
+        self.n_records = 0
+        self.years = Counter()
+        self.fields = Counter()
+        self.journals = Counter()
+        self._n_edits = _n_edits[0]
+        for rec in records:
+            self.add(rec)
+
+    @property
+    def outdated(self):
+        """Whether records were edited in place since the aggregation"""
+        return self._n_edits != _n_edits[0]
+
+    def add(self, rec):
+        """Account for a record entering the collection"""
+        self.n_records += 1
+        year = rec.year
+        if year is not None:
+            self.years[year] += 1
+        self.fields.update(rec.keys())
+        journal = rec.get('JT')
+        if journal:
+            self.journals[journal] += 1
+
+    def remove(self, rec):
+        """Account for a record leaving the collection"""
+        if self.outdated:  # the fields may differ from those counted
+            return
+        self.n_records -= 1
+        _counter_discard(self.years, rec.year)
+        for field in rec.keys():
+            _counter_discard(self.fields, field)
+        _counter_discard(self.journals, rec.get('JT'))
+
+    @property
+    def year_range(self):
+        """The earliest and the latest publication year"""
+        if not self.years:
+            return None
+        return min(self.years), max(self.years)
+
+    def merge(self, n_records, years, fields, journals):
+        """Add the aggregates of another collection, e.g. a shard"""
+        self.n_records += n_records
+        self.years.update(years)
+        self.fields.update(fields)
+        self.journals.update(journals)
+        return self
+
+    def describe(self, n_journals=10):
+        """The summary returned by Records.describe"""
+        coverage = dict((k, float(v) / self.n_records)
+                        for k, v in self.fields.items())
+        return {'n_records': self.n_records,
+                'year_range': self.year_range,
+                'field_coverage': coverage,
+                'top_journals': self.journals.most_common(n_journals)}
+
+
 class Records(list):
     """Process PubMed records
 
@@ -368,6 +592,7 @@ class Records(list):
     """
     def __init__(self, records=None):
         self.exclude_ = []
+        self._summary = _RecordsSummary()
         if records:
             self.extend(records)
 
@@ -424,8 +649,328 @@ class Records(list):
         -------
         self : instance of pymed.Records
         """
-        [self.remove(r) for ii, r in enumerate(self) if ii in self.exclude_]
+        exclude = set(self.exclude_)
+        keep = []
+        for ii, rec in enumerate(self):
+            if ii in exclude:
+                self._summary.remove(rec)
+            else:
+                keep.append(rec)
+        list.__setitem__(self, slice(None), keep)
         self.exclude_ = []
+        return self
+
+    def describe(self, n_journals=10):
+        """Summarize records
+
+        The summary is maintained incrementally while records are added or
+        removed, so calling this method does not iterate over the records,
+        unless records were edited in place since the last call.
+
+        Parameters
+        ----------
+        n_journals : int
+            The number of most frequent journals to report.
+
+        Returns
+        -------
+        summary : dict
+            The number of records ('n_records'), the earliest and the latest
+            publication year ('year_range', None if not available), the
+            fraction of records containing each field ('field_coverage') and
+            the most frequent journals with their counts ('top_journals').
+        """
+        return self._get_summary().describe(n_journals)
+
+    def _get_summary(self):
+        """Aux method: the running summary, recomputed after edits"""
+        if self._summary.outdated:
+            self._summary = _RecordsSummary(self)
+        return self._summary
+
+    def dates(self, field='DP'):
+        """Get dates of all records as array
+
+        Parameters
+        ----------
+        field : str
+            The date field, one of PMD.DATE_FIELDS.
+
+        Returns
+        -------
+        dates : ndarray, dtype datetime64[D]
+            The dates. Missing month or day default to the first, missing
+            or unparsable dates are NaT.
+        """
+        import numpy as np
+        if field not in PMD.DATE_FIELDS:
+            raise ValueError('%s is not a date field. Please use one of %s'
+                             % (field, ', '.join(PMD.DATE_FIELDS)))
+        ymd = np.ones((len(self), 3), dtype=np.int64)
+        ymd[:, 0] = 1970
+        valid = np.zeros(len(self), dtype=bool)
+        for ii, rec in enumerate(self):
+            date = rec._dates.get(field)
+            if date is not None:
+                ymd[ii] = date.year, date.month or 1, date.day or 1
+                valid[ii] = True
+        out = (ymd[:, 0] - 1970).astype('datetime64[Y]')
+        out = out.astype('datetime64[M]') + (ymd[:, 1] - 1).astype('m8[M]')
+        out = out.astype('datetime64[D]') + (ymd[:, 2] - 1).astype('m8[D]')
+        out[~valid] = np.datetime64('NaT')
+        return out
+
+    def dois(self, normalize=True):
+        """Get the DOIs of all records
+
+        DOIs are extracted once per record and cached, the cache is reset
+        when the AID, LID or SO fields of a record change.
+
+        Parameters
+        ----------
+        normalize : bool
+            If True, DOIs are lower-cased, see `normalize_doi`, so they can
+            be compared with DOIs from other sources.
+
+        Returns
+        -------
+        dois : ndarray, dtype object
+            The DOI of each record, None if not available.
+        """
+        import numpy as np
+        out = np.empty(len(self), dtype=object)
+        for ii, rec in enumerate(self):
+            doi = rec.get_doi()
+            out[ii] = normalize_doi(doi) if normalize and doi else doi
+        return out
+
+    def doi_index(self, normalize=True):
+        """Map PubMed IDs to DOIs
+
+        Parameters
+        ----------
+        normalize : bool
+            If True, DOIs are lower-cased, see `normalize_doi`.
+
+        Returns
+        -------
+        index : dict
+            The DOI of each record keyed by PubMed ID. Records without DOI
+            are omitted.
+        """
+        return dict((rec.get('PMID'), doi) for rec, doi in
+                    zip(self, self.dois(normalize=normalize))
+                    if doi is not None)
+
+    def to_matrix(self, fields=None, vocabulary=None, kind='tfidf', n_jobs=1,
+                  chunksize=1000):
+        """Build a sparse document-term matrix for text mining
+
+        Parameters
+        ----------
+        fields : list-like | None
+            The fields to extract the terms from. If None, defaults to Title
+            and Abstract for 'tfidf' and 'count' and to MeSH Terms for
+            'mesh-onehot'.
+        vocabulary : dict | int | None
+            The mapping from terms to columns. Terms missing from the
+            mapping are ignored. If int, terms are hashed into this number of
+            columns, which is suited for out-of-core corpora. If None, the
+            vocabulary is learned from the records.
+        kind : str
+            The weighting. Should be 'tfidf', 'count' or 'mesh-onehot'.
+        n_jobs : int
+            The number of processes used for tokenization. If -1, all CPUs
+            are used.
+        chunksize : int
+            The number of records passed to a process at once.
+
+        Returns
+        -------
+        matrix : instance of scipy.sparse.csr_matrix
+            The document-term matrix, shape (n_records, n_terms).
+        vocabulary : dict | int
+            The mapping from terms to columns, or the number of hashed
+            columns.
+        pmids : list of str
+            The PubMed ID of the record at each row.
+        """
+        from .features import to_matrix
+        return to_matrix(self, fields=fields, vocabulary=vocabulary,
+                         kind=kind, n_jobs=n_jobs, chunksize=chunksize)
+
+    def cooccurrence(self, field='MH', normalize=True, vocabulary=None,
+                     n_jobs=1, chunksize=1000):
+        """Count co-authorships or co-occurrences of MeSH terms
+
+        Parameters
+        ----------
+        field : str
+            The list-valued field, e.g. 'MH' for MeSH terms or 'AU' and
+            'FAU' for authors.
+        normalize : bool
+            If True, qualifiers are stripped from MeSH headings and author
+            names are lower-cased without accents and periods.
+        vocabulary : dict | None
+            The mapping from terms to rows and columns, e.g. from another
+            collection of records. Terms missing from the mapping are
+            ignored. If None, the vocabulary is learned from the records.
+        n_jobs : int
+            The number of processes used for normalizing terms. If -1, all
+            CPUs are used.
+        chunksize : int
+            The number of records passed to a process at once.
+
+        Returns
+        -------
+        matrix : instance of scipy.sparse.csr_matrix
+            The symmetric matrix of the number of records shared by each
+            pair of terms, shape (n_terms, n_terms). The diagonal contains
+            the number of records of each term.
+        vocabulary : dict
+            The mapping from terms to rows and columns.
+        """
+        from .features import cooccurrence
+        return cooccurrence(self, field=field, normalize=normalize,
+                            vocabulary=vocabulary, n_jobs=n_jobs,
+                            chunksize=chunksize)
+
+    def near_duplicates(self, fields=('TI', 'AB'), threshold=0.8,
+                        num_perm=128, shingle_size=3, links=True, seed=42):
+        """Find groups of near-duplicate records
+
+        Records are compared by the Jaccard similarity of their word
+        shingles, estimated with MinHash signatures and locality sensitive
+        hashing, so the cost grows sub-quadratically with the number of
+        records.
+
+        Parameters
+        ----------
+        fields : list-like
+            The fields to compare.
+        threshold : float
+            The similarity above which records are considered near
+            duplicates.
+        num_perm : int
+            The number of hash functions used for the signatures.
+        shingle_size : int
+            The number of consecutive words forming a shingle.
+        links : bool
+            If True, records referencing each other as erratum, retraction,
+            update or republication (PMD.VERSION_TAGS) are grouped as well.
+        seed : int
+            The seed of the hash functions.
+
+        Returns
+        -------
+        groups : list of list of int
+            The indices of records in each group of two or more records.
+            E.g. to keep only the first record of each group, extend
+            `exclude_` with the remaining indices and call `drop`.
+        """
+        from .dedup import near_duplicates
+        return near_duplicates(self, fields=fields, threshold=threshold,
+                               num_perm=num_perm, shingle_size=shingle_size,
+                               links=links, seed=seed)
+
+    def link_graph(self, tags=None):
+        """Build the graph of comments, errata, retractions, updates, etc.
+
+        Parameters
+        ----------
+        tags : list-like | None
+            The link tags to parse. If None, defaults to PMD.LINK_TAGS.
+
+        Returns
+        -------
+        graph : instance of pymed.links.LinkGraph
+            The links between the records and the records they reference,
+            keyed by PubMed ID.
+        """
+        from .links import LinkGraph
+        return LinkGraph(self, tags=tags)
+
+    def parallel_map(self, func, n_jobs=1, chunksize=1000, dtype=None):
+        """Apply a function to each record in parallel
+
+        Records are sent to the worker processes in chunks, so costly
+        functions, e.g., `PubmedRecord.match` or `PubmedRecord.as_corpus`,
+        can use all CPUs.
+
+        Parameters
+        ----------
+        func : callable
+            The function applied to each record. If n_jobs > 1, it must be
+            defined at the top level of a module.
+        n_jobs : int
+            The number of processes. If -1, all CPUs are used.
+        chunksize : int
+            The number of records sent to a process at once.
+        dtype : numpy dtype | None
+            If not None, the results are returned as array of this type.
+
+        Returns
+        -------
+        results : list | ndarray | instance of pymed.Records
+            The results in the order of the records. If func returns
+            instances of PubmedRecord, the results are returned as Records.
+        """
+        from .parallel import parallel_map
+        return parallel_map(self, func, n_jobs=n_jobs, chunksize=chunksize,
+                            dtype=dtype)
+
+    def parallel_filter(self, func, n_jobs=1, chunksize=1000):
+        """Select records for which a function is true, in parallel
+
+        Parameters
+        ----------
+        func : callable
+            The predicate evaluated on each record. If n_jobs > 1, it must
+            be defined at the top level of a module.
+        n_jobs : int
+            The number of processes. If -1, all CPUs are used.
+        chunksize : int
+            The number of records sent to a process at once.
+
+        Returns
+        -------
+        records : instance of pymed.Records
+            The selected records, in their original order.
+        """
+        from .parallel import parallel_filter
+        return parallel_filter(self, func, n_jobs=n_jobs, chunksize=chunksize)
+
+    def save_sharded(self, dirname, by='pmid', n_shards=16, n_jobs=1,
+                     executor=None):
+        """Save records as shards processed with map-reduce
+
+        The shards are written as JSON files. Records marked for exclusion
+        are skipped.
+
+        Parameters
+        ----------
+        dirname : str
+            The directory of the shards, which is created if needed.
+        by : str
+            'pmid' to spread records evenly by hashing their PubMed IDs,
+            or 'year' for one shard per publication year.
+        n_shards : int
+            The number of shards if by is 'pmid'.
+        n_jobs : int
+            The number of processes working on the shards. If -1, all
+            CPUs are used.
+        executor : object | None
+            The executor working on the shards, see
+            pymed.sharded.ShardedRecords.
+
+        Returns
+        -------
+        sharded : instance of pymed.sharded.ShardedRecords
+            The sharded records.
+        """
+        from .sharded import partition_records
+        return partition_records(self, dirname, by=by, n_shards=n_shards,
+                                 n_jobs=n_jobs, executor=executor)
 
     def save(self, fname, mode='w', indent=None, separators=None):
         """Save records to json file
@@ -443,26 +988,101 @@ class Records(list):
         """
         write_records(self, fname)
 
-    def save_as_bibtex(self, fname):
+    def save_as_bibtex(self, fname, n_jobs=1, chunksize=1000,
+                       deterministic=False):
         """Export records in bibtex file
 
+        Keys are made unique by appending a, b, c, ... to the keys of
+        records sharing the first author's surname and the year.
+
         Parameters
         ----------
         fname : str
             The name of the file to save the records in.
+        n_jobs : int
+            The number of processes formatting records in parallel. If -1,
+            all CPUs are used.
+        chunksize : int
+            The number of records formatted and written at once.
+        deterministic : bool
+            If True, suffixes follow the PubMed IDs instead of the order of
+            the records, so exporting the same records in any order gives
+            identical keys. This requires an additional pass over the
+            records.
         """
-        _export_records(self, fname, '.bib', 'to_bibtex')
+        from .export import export_records, BibtexKeyIndex, _iter_included
+        key_index = BibtexKeyIndex(list(_iter_included(self))
+                                   if deterministic else None)
+        export_records(self, fname, 'bibtex', n_jobs=n_jobs,
+                       chunksize=chunksize, key_index=key_index)
 
-    def save_as_nbib(self, fname):
-        """Export records in bibtex file
+    def save_as_nbib(self, fname, n_jobs=1, chunksize=1000):
+        """Export records in Medline file
 
         Parameters
         ----------
         fname : str
             The name of the file to save the records in.
+        n_jobs : int
+            The number of processes formatting records in parallel. If -1,
+            all CPUs are used.
+        chunksize : int
+            The number of records formatted and written at once.
+        """
+        from .export import export_records
+        export_records(self, fname, 'nbib', n_jobs=n_jobs,
+                       chunksize=chunksize)
 
+    def save_as_ris(self, fname, n_jobs=1, chunksize=1000):
+        """Export records in RIS file
+
+        Parameters
+        ----------
+        fname : str
+            The name of the file to save the records in.
+        n_jobs : int
+            The number of processes formatting records in parallel. If -1,
+            all CPUs are used.
+        chunksize : int
+            The number of records formatted and written at once.
         """
-        _export_records(self, fname, '.nbib', 'to_nbib')
+        from .export import export_records
+        export_records(self, fname, 'ris', n_jobs=n_jobs,
+                       chunksize=chunksize)
+
+    def save_as_csljson(self, fname, n_jobs=1, chunksize=1000):
+        """Export records in CSL-JSON file
+
+        Parameters
+        ----------
+        fname : str
+            The name of the file to save the records in.
+        n_jobs : int
+            The number of processes formatting records in parallel. If -1,
+            all CPUs are used.
+        chunksize : int
+            The number of records formatted and written at once.
+        """
+        from .export import export_records
+        export_records(self, fname, 'csljson', n_jobs=n_jobs,
+                       chunksize=chunksize)
+
+    def save_as_endnote(self, fname, n_jobs=1, chunksize=1000):
+        """Export records in EndNote XML file
+
+        Parameters
+        ----------
+        fname : str
+            The name of the file to save the records in.
+        n_jobs : int
+            The number of processes formatting records in parallel. If -1,
+            all CPUs are used.
+        chunksize : int
+            The number of records formatted and written at once.
+        """
+        from .export import export_records
+        export_records(self, fname, 'endnote', n_jobs=n_jobs,
+                       chunksize=chunksize)
 
     def tolist(self):
         """Convert records to list
@@ -532,6 +1152,7 @@ class Records(list):
                                ' .exclude_ attribute')
         else:
             list.insert(self, index, record)
+            self._summary.add(record)
 
     def pop(self, index):
         """Remove and return record
@@ -548,20 +1169,82 @@ class Records(list):
         """
         if index in self.exclude_:
             self.exclude_.remove(index)
-        return list.pop(self, index)
+        record = list.pop(self, index)
+        self._summary.remove(record)
+        return record
+
+    def remove(self, record):
+        """Remove first occurrence of record
+
+        Parameters
+        ----------
+        record : instance of pymed.PubmedRecord
+            The PubMed record to be removed.
+        """
+        record = list.pop(self, list.index(self, record))
+        self._summary.remove(record)
+
+    def __setitem__(self, index, value):
+        """Replace records"""
+        if isinstance(index, slice):
+            values = list(value)
+            if not all(isinstance(v, PubmedRecord) for v in values):
+                raise TypeError('The items to be added must be instances of '
+                                'PubmedRecord.')
+            old = list.__getitem__(self, index)
+            list.__setitem__(self, index, values)
+        else:
+            if not isinstance(value, PubmedRecord):
+                raise TypeError('The item to be added must be an instance of '
+                                'PubmedRecord.')
+            old, values = [list.__getitem__(self, index)], [value]
+            list.__setitem__(self, index, value)
+        for rec in old:
+            self._summary.remove(rec)
+        for rec in values:
+            self._summary.add(rec)
+
+    def __delitem__(self, index):
+        """Delete records"""
+        old = list.__getitem__(self, index)
+        list.__delitem__(self, index)
+        for rec in (old if isinstance(index, slice) else [old]):
+            self._summary.remove(rec)
+
+    def __setslice__(self, i, j, values):
+        """Slice assignment operator"""
+        self.__setitem__(slice(i, j), values)
+
+    def __delslice__(self, i, j):
+        """Slice deletion operator"""
+        self.__delitem__(slice(i, j))
+
+    def clear(self):
+        """Remove all records"""
+        del self[:]
+        self.exclude_ = []
+
+    def __imul__(self, n):
+        """Repetition operator"""
+        list.__imul__(self, n)
+        self._summary = _RecordsSummary(self)
+        return self
+
+    def __reduce__(self):
+        """Support pickling and copying without double counting"""
+        return (self.__class__, (self.tolist(),),
+                {'exclude_': list(self.exclude_)})
 
     def __repr__(self):
         """ Summarize Records """
         out = '<Records | %i entries' % len(self)
-        if self:
-            minyear = min(r.year for r in self)
-            maxyear = max(r.year for r in self)
-            if minyear == maxyear:
-                yrange = str(minyear)
-            else:
-                yrange = ' | %i - %i' % (maxyear, minyear)
-        else:
+        yrange = self._get_summary().year_range
+        if yrange is None:
             yrange = ''
+        elif yrange[0] == yrange[1]:
+            yrange = ' | %i' % yrange[0]
+        else:
+            yrange = ' | %i - %i' % yrange
         return out + '%s>' % yrange
 
     def __add__(self, other):
@@ -577,14 +1260,106 @@ class Records(list):
         self.extend(values)
         return self
 
+    def __getitem__(self, index):
+        """Get a record, or a new instance of Records for slices"""
+        if isinstance(index, slice):
+            return Records(list.__getitem__(self, index))
+        return list.__getitem__(self, index)
+
     def __getslice__(self, *args):
         """Slicing operator"""
         return Records(list.__getslice__(self, *args))
 
 
-def query_records(term, client, pubmed_fields='all', chunksize=50):
+def _wait_for_eutils():
+    """Aux Function: space E-utilities requests
+
+    As Bio.Entrez does, requests are spaced to respect the NCBI limit of
+    three requests per second, or ten with an API key (Bio.Entrez.api_key).
+
+    Returns
+    -------
+    wait : float
+        The time slept in seconds.
+    """
+    from Bio import Entrez
+    delay = 0.1 if Entrez.api_key else 0.37
+    with _EUTILS_LOCK:
+        wait = max(_last_request[0] + delay - time.time(), 0.)
+        if wait:
+            time.sleep(wait)
+        _last_request[0] = time.time()
+    return wait
+
+
+def _open_eutils(utility, **params):
+    """Aux Function: POST a request to an E-utility"""
+    from Bio import Entrez
+    try:
+        from urllib.parse import urlencode
+    except ImportError:
+        from urllib import urlencode
+    urlopen, _, _ = _get_urllib()
+
+    params.setdefault('tool', Entrez.tool)
+    if Entrez.api_key:
+        params.setdefault('api_key', Entrez.api_key)
+    return urlopen(EUTILS_URL + utility + '.fcgi',
+                   data=urlencode(params).encode('utf-8'))
+
+
+def _entrez_request(utility, phase, emit, max_tries, sleep_between_tries,
+                    **params):
+    """Aux Function: request an E-utility with retries
+
+    Failed requests are repeated unless they are bad requests (HTTP 4XX,
+    except 429 Too Many Requests). For HTTP 429, the delay requested by
+    the server (Retry-After) is honored. The time spent respecting the
+    NCBI rate limit is reported separately from the request duration.
+
+    Returns
+    -------
+    data : bytes
+        The response.
+    """
+    _, _, URLError = _get_urllib()
+    for attempt in range(1, max_tries + 1):
+        wait = _wait_for_eutils()
+        if wait and emit is not None:
+            emit('throttle', phase=phase, wait=wait)
+        t0 = time.time()
+        try:
+            data = _open_eutils(utility, **params).read()
+        except URLError as e:
+            code = getattr(e, 'code', None)
+            if (attempt == max_tries or
+                    (code is not None and code // 100 == 4 and code != 429)):
+                raise
+            wait = sleep_between_tries
+            headers = getattr(e, 'headers', None)
+            retry_after = (headers.get('Retry-After') if headers is not None
+                           else None)
+            if code == 429 and retry_after and retry_after.isdigit():
+                wait = float(retry_after)
+            if emit is not None:
+                emit('retry', phase=phase, error=str(e), wait=wait)
+            time.sleep(wait)
+            continue
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        if emit is not None:
+            emit('phase', phase=phase, duration=time.time() - t0,
+                 n_bytes=len(data))
+        return data
+
+
+def query_records(term, client, pubmed_fields='all', chunksize=50,
+                  callback=None, max_tries=None, sleep_between_tries=None):
     """Get records from PubMed search
 
+    The search is stored on the NCBI history server and the records are
+    fetched from there in chunks.
+
     Parameters
     ----------
     term : string
@@ -596,35 +1371,51 @@ def query_records(term, client, pubmed_fields='all', chunksize=50):
     chunksize : integer
         size of the searches per query. In case the query fails, try
             using a slightly lower chunk size.
+    callback : callable | list of callable | None
+        Functions called with the events of the query, e.g., the duration
+        and size of each request, see pymed.metrics. An instance of
+        pymed.metrics.QueryMetrics aggregates them. If None and debug
+        logging of the 'pymed' logger is off, no events are created.
+        Progress messages are logged to the 'pymed' logger at INFO level.
+    max_tries : int | None
+        The number of attempts for each request. If None, defaults to
+        Bio.Entrez.max_tries.
+    sleep_between_tries : float | None
+        The delay between attempts in seconds. If None, defaults to
+        Bio.Entrez.sleep_between_tries.
 
     Returns
     -------
     recs : instance of pymed.Records
     """
+    from Bio import Entrez, Medline
+    from .metrics import _get_emit, logger
+
     if pubmed_fields is None:
         pubmed_fields = PMD.DEF_FIELDS
-
-    print('Starting query.')
-    print('... please be patient. This may take some time.')
-
-    Entrez.email = client
-    handle = Entrez.egquery(term=term)  # create handle
-    record = Entrez.read(handle)  # launch search an return records
-    _retmax = sum(int(r['Count']) for r in record['eGQueryResult']
-                  if r['DbName'] == 'pubmed')
-
-    print('... %i records found.' % _retmax)
-    print('... downloading records.')
-    handle = Entrez.esearch(db='pubmed', term=term,
-                            retmax=str(_retmax),
-                            usehistory='n')  # create another handle
-
-    hit = Entrez.read(handle)  # parse pubmed IDs...
-    id_list = list(hit['IdList'])
-    if not id_list:
-        print(r"I couldn't find anything")
-
-    chunks = _make_chunks(chunksize, id_list, '')
+    emit = _get_emit(callback)
+    if max_tries is None:
+        max_tries = Entrez.max_tries
+    if sleep_between_tries is None:
+        sleep_between_tries = Entrez.sleep_between_tries
+
+    t_start = time.time()
+    logger.info('Starting query.')
+    logger.info('... please be patient. This may take some time.')
+
+    def request(utility, **params):
+        return _entrez_request(utility, utility, emit, max_tries,
+                               sleep_between_tries, db='pubmed',
+                               email=client, **params)
+
+    data = request('esearch', term=term, retmax='0', usehistory='y')
+    hit = Entrez.read(io.BytesIO(data))
+    count = int(hit['Count'])
+
+    logger.info('... %i records found.', count)
+    if not count:
+        logger.info("I couldn't find anything")
+    logger.info('... downloading records.')
 
     def match(key):
         if isinstance(pubmed_fields, list):
@@ -635,17 +1426,24 @@ def query_records(term, client, pubmed_fields='all', chunksize=50):
             return RuntimeError('No instruction how to select fields.')
 
     recs = Records()
-    while True:
-        chunk = next(chunks, 0)
-        if chunk == 0:  # initialize end
-            break
-        elif not chunk:  # iterate through trailing block.
-            chunk = [ch for ch in chunk if ch]
-        handle = Entrez.efetch(db='pubmed', id=','.join(chunk),
-                               rettype='medline', retmode='text')
-        for rec in Medline.parse(handle):
+    for retstart in range(0, count, chunksize):
+        data = request('efetch', webenv=hit['WebEnv'],
+                       query_key=hit['QueryKey'], retstart=str(retstart),
+                       retmax=str(chunksize), rettype='medline',
+                       retmode='text')
+        t0 = time.time()
+        parsed = list(Medline.parse(io.StringIO(data.decode('utf-8'))))
+        t1 = time.time()
+        for rec in parsed:
             recs.append(PubmedRecord(dict((k, v) for k, v in rec.items()
                         if match(k))))
-
-    print('Ready.')
+        if emit is not None:
+            emit('phase', phase='parse', duration=t1 - t0,
+                 n_records=len(parsed))
+            emit('phase', phase='filter', duration=time.time() - t1,
+                 n_records=len(parsed))
+
+    if emit is not None:
+        emit('done', n_records=len(recs), duration=time.time() - t_start)
+    logger.info('Ready.')
     return recs
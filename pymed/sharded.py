@@ -0,0 +1,342 @@
+"""Corpora partitioned into shards on disk, processed with map-reduce"""
+
+# License: BSD (3-clause)
+
+import io
+import json
+import os
+import os.path as op
+from functools import reduce
+
+from .export import _iter_included
+from .features import _hash_term
+from .utils import _parallel_imap
+
+PARTITIONS = ('pmid', 'year')
+MANIFEST = 'shards.json'
+
+
+def _read_shard(fname):
+    """Aux Function: read a shard in any of the supported formats"""
+    if fname.endswith(('.xml', '.xml.gz')):
+        from .pubmed_xml import read_pubmed_xml
+        return read_pubmed_xml(fname)
+    from .pymed import read_records
+    return read_records(fname)
+
+
+def _run_shard(args):
+    """Aux Function: apply a function to a shard, runs in the workers"""
+    fname, func, func_args = args
+    return func(_read_shard(fname), *func_args)
+
+
+def _find_shard(records, regexp):
+    """Aux Function: the matching records of a shard"""
+    return records.find(regexp)
+
+
+def _filter_shard(records, func):
+    """Aux Function: the selected records of a shard"""
+    return records.__class__(rec for rec in records if func(rec))
+
+
+def _summarize_shard(records):
+    """Aux Function: the record count and counters of a shard"""
+    summary = records._get_summary()
+    return (summary.n_records, summary.years, summary.fields,
+            summary.journals)
+
+
+def _export_shard(records, fname, fmt):
+    """Aux Function: export a shard"""
+    from .export import export_records
+    return export_records(records, fname, fmt)
+
+
+def _concatenate(records, other):
+    """Aux Function: combine the records of two shards"""
+    records.extend(other)
+    return records
+
+
+class ShardedRecords(object):
+    """Process a corpus stored as several files
+
+    Each shard is loaded and processed by a worker, so the corpus does not
+    need to fit into the memory of a single process. Use
+    `partition_records` to split records into shards and `read_sharded` to
+    open them again. Any list of files readable by `read_records` (json) or
+    `read_pubmed_xml` (.xml, .xml.gz), e.g., the PubMed baseline, can be
+    used as shards as well.
+
+    Parameters
+    ----------
+    fnames : list of str
+        The files of the shards.
+    n_jobs : int
+        The number of processes working on shards in parallel. If -1, all
+        CPUs are used. Ignored if executor is given.
+    executor : object | None
+        An object with a `map(func, iterable)` method returning the
+        results in order, e.g., an instance of
+        concurrent.futures.ProcessPoolExecutor, or a client distributing
+        the shards to several machines. The shards must then be readable
+        from all machines. If None, a local pool of n_jobs processes is
+        used.
+    keys : list | None
+        The partition key of each shard, e.g. the publication year.
+    n_records : list of int | None
+        The number of records of each shard, if known.
+
+    Attributes
+    ----------
+    fnames : list of str
+        The files of the shards.
+    keys : list | None
+        The partition key of each shard.
+    """
+    def __init__(self, fnames, n_jobs=1, executor=None, keys=None,
+                 n_records=None):
+        self.fnames = list(fnames)
+        self.n_jobs = n_jobs
+        self.executor = executor
+        self.keys = keys
+        self._n_records = n_records
+
+    def map(self, func, args=(), reducer=None):
+        """Apply a function to each shard, optionally reduce the results
+
+        Parameters
+        ----------
+        func : callable
+            The function called as func(records, *args) for each shard,
+            where records is an instance of Records. It must be defined at
+            the top level of a module to be sent to the workers.
+        args : tuple
+            Additional arguments passed to func.
+        reducer : callable | None
+            The function combining two results, e.g. operator.add. If None,
+            the list of results is returned.
+
+        Returns
+        -------
+        results : list | object
+            The result for each shard, in the order of the shards, or the
+            reduced result.
+        """
+        tasks = [(fname, func, tuple(args)) for fname in self.fnames]
+        if self.executor is not None:
+            results = self.executor.map(_run_shard, tasks)
+        else:
+            results = _parallel_imap(_run_shard, tasks, self.n_jobs)
+        if reducer is None:
+            return list(results)
+        return reduce(reducer, results)
+
+    def find(self, regexp):
+        """Find records for which as substring or regexp matches
+
+        Parameters
+        ----------
+        regexp : str
+            Regular expression or substring to select particular records.
+
+        Returns
+        -------
+        records : instance of pymed.Records
+            The matching records, in the order of the shards.
+        """
+        return self._collect(self.map(_find_shard, (regexp,)))
+
+    def filter(self, func):
+        """Select the records for which a function is true
+
+        Parameters
+        ----------
+        func : callable
+            The predicate evaluated on each record. It must be defined at
+            the top level of a module.
+
+        Returns
+        -------
+        records : instance of pymed.Records
+            The selected records, in the order of the shards.
+        """
+        return self._collect(self.map(_filter_shard, (func,)))
+
+    def _collect(self, results):
+        """Aux Function: concatenate the records of all shards"""
+        from .pymed import Records
+        return reduce(_concatenate, results, Records())
+
+    def describe(self, n_journals=10):
+        """Summarize all records
+
+        Parameters
+        ----------
+        n_journals : int
+            The number of most frequent journals to report.
+
+        Returns
+        -------
+        summary : dict
+            The summary, as returned by Records.describe.
+        """
+        from .pymed import _RecordsSummary
+        summary = _RecordsSummary()
+        for counts in self.map(_summarize_shard):
+            summary.merge(*counts)
+        return summary.describe(n_journals)
+
+    def export(self, dirname, fmt='nbib'):
+        """Export each shard to a file
+
+        Parameters
+        ----------
+        dirname : str
+            The directory of the files, which is created if needed.
+        fmt : str
+            The format, e.g. 'nbib', 'bibtex', 'ris', 'csljson' or
+            'endnote'.
+
+        Returns
+        -------
+        fnames : list of str
+            The exported files, in the order of the shards.
+        """
+        if not op.isdir(dirname):
+            os.makedirs(dirname)
+        fnames = [op.join(dirname, 'shard-%04i' % ii)
+                  for ii in range(len(self.fnames))]
+        tasks = [(fname, _export_shard, (out, fmt))
+                 for fname, out in zip(self.fnames, fnames)]
+        if self.executor is not None:
+            return list(self.executor.map(_run_shard, tasks))
+        return list(_parallel_imap(_run_shard, tasks, self.n_jobs))
+
+    def to_records(self):
+        """Load all records
+
+        Returns
+        -------
+        records : instance of pymed.Records
+            The records, in the order of the shards.
+        """
+        return self._collect(_read_shard(fname) for fname in self.fnames)
+
+    def __iter__(self):
+        for fname in self.fnames:
+            for rec in _read_shard(fname):
+                yield rec
+
+    def __len__(self):
+        if self._n_records is None:
+            self._n_records = self.map(len)
+        return sum(self._n_records)
+
+    def __repr__(self):
+        return '<ShardedRecords | %i shards>' % len(self.fnames)
+
+
+def _shard_key(rec, by, n_shards):
+    """Aux Function: the shard a record belongs to"""
+    if by == 'pmid':
+        pmid = rec.get('PMID')
+        return 'unknown' if pmid is None else _hash_term(pmid, n_shards)
+    year = rec.year
+    return 'unknown' if year is None else year
+
+
+def partition_records(records, dirname, by='pmid', n_shards=16, n_jobs=1,
+                      executor=None):
+    """Write records to shards on disk
+
+    The records are written as they come, so records can be streamed from
+    a larger source, e.g. `pymed.iter_pubmed_xml`, without being held in
+    memory. Shards are always written as JSON files, as by Records.save;
+    other formats, e.g. the PubMed XML baseline, can be used as shards in
+    place with ShardedRecords.
+
+    Parameters
+    ----------
+    records : iterable of pymed.PubmedRecord
+        The records. Indices in the `exclude_` attribute, if present, are
+        skipped.
+    dirname : str
+        The directory of the shards, which is created if needed.
+    by : str
+        'pmid' to spread records evenly by hashing their PubMed IDs, or
+        'year' for one shard per publication year. Records without PubMed
+        ID or date, respectively, go to the 'unknown' shard.
+    n_shards : int
+        The number of shards if by is 'pmid'.
+    n_jobs : int
+        The number of processes working on the shards. If -1, all CPUs
+        are used.
+    executor : object | None
+        The executor working on the shards, see ShardedRecords.
+
+    Returns
+    -------
+    sharded : instance of pymed.sharded.ShardedRecords
+        The sharded records.
+    """
+    if by not in PARTITIONS:
+        raise ValueError('by must be one of %s, got %s.'
+                         % (', '.join(PARTITIONS), by))
+    if not op.isdir(dirname):
+        os.makedirs(dirname)
+    files, counts = {}, {}
+    try:
+        for rec in _iter_included(records):
+            key = _shard_key(rec, by, n_shards)
+            if key not in files:
+                fname = op.join(dirname, 'shard-%s.json' % key)
+                files[key] = io.open(fname, 'w', encoding='utf-8')
+                files[key].write(u'[')
+                counts[key] = 0
+            text = json.dumps(rec)
+            if not isinstance(text, type(u'')):
+                text = text.decode('utf-8')
+            files[key].write((u',\n' if counts[key] else u'\n') + text)
+            counts[key] += 1
+    finally:
+        for fid in files.values():
+            fid.write(u'\n]\n')
+            fid.close()
+
+    keys = sorted(files, key=lambda k: (k == 'unknown', k))
+    manifest = {'by': by,
+                'shards': [{'key': k, 'fname': 'shard-%s.json' % k,
+                            'n_records': counts[k]} for k in keys]}
+    with open(op.join(dirname, MANIFEST), 'w') as fid:
+        json.dump(manifest, fid, indent=4)
+    return read_sharded(dirname, n_jobs=n_jobs, executor=executor)
+
+
+def read_sharded(dirname, n_jobs=1, executor=None):
+    """Open records written by partition_records
+
+    Parameters
+    ----------
+    dirname : str
+        The directory of the shards.
+    n_jobs : int
+        The number of processes working on the shards. If -1, all CPUs
+        are used.
+    executor : object | None
+        The executor working on the shards, see ShardedRecords.
+
+    Returns
+    -------
+    sharded : instance of pymed.sharded.ShardedRecords
+        The sharded records.
+    """
+    with open(op.join(dirname, MANIFEST)) as fid:
+        manifest = json.load(fid)
+    shards = manifest['shards']
+    return ShardedRecords([op.join(dirname, s['fname']) for s in shards],
+                          n_jobs=n_jobs, executor=executor,
+                          keys=[s['key'] for s in shards],
+                          n_records=[s['n_records'] for s in shards])
@@ -0,0 +1,391 @@
+"""A local stand-in for the Entrez E-utilities and the DOI resolver
+
+The server answers esearch (including the history server), efetch
+(Medline text and PubMed XML) and DOI lookups from a collection of
+records, without network access. Latency, server errors and rate limiting
+(HTTP 429) can be simulated to test and benchmark the download code.
+"""
+
+# License: BSD (3-clause)
+
+import random
+import re
+import threading
+import time
+from xml.sax.saxutils import escape
+
+try:
+    # For Python 3.0 and later
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, quote, unquote, urlsplit
+    from urllib.request import (BaseHandler, Request, build_opener,
+                                install_opener)
+    import urllib.request as urllib_request
+except ImportError:
+    # Fall back to Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import quote, unquote
+    from urlparse import parse_qs, urlsplit
+    from urllib2 import BaseHandler, Request, build_opener, install_opener
+    import urllib2 as urllib_request
+
+ENTREZ_HOST = 'eutils.ncbi.nlm.nih.gov'
+DOI_HOSTS = ('dx.doi.org', 'doi.org')
+
+ESEARCH_TMP = u"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE eSearchResult PUBLIC "-//NLM//DTD esearch 20060628//EN" \
+"https://eutils.ncbi.nlm.nih.gov/eutils/dtd/20060628/esearch.dtd">
+<eSearchResult><Count>{count}</Count><RetMax>{retmax}</RetMax>\
+<RetStart>{retstart}</RetStart>{history}<IdList>{ids}</IdList>\
+<TranslationSet/><QueryTranslation>{term}</QueryTranslation>\
+</eSearchResult>
+"""
+
+# e.g. 'diffusion kurtosis[TI]'
+_TERM_REGEX = re.compile(r'([^\s\[]+)(?:\[(\w+)\])?')
+
+
+def _as_list(value):
+    """Aux Function: wrap single values in a list"""
+    return value if isinstance(value, list) else [value]
+
+
+def _to_medline(rec):
+    """Aux Function: format a record as efetch does, one line per item"""
+    out = [u'PMID- %s' % rec['PMID']]
+    for key, value in rec.items():
+        if key != 'PMID':
+            out.extend(u'%s- %s' % (key.ljust(4), v)
+                       for v in _as_list(value))
+    return u'\n'.join(out) + u'\n'
+
+
+def _xml_element(tag, text, attrs=''):
+    """Aux Function: a single XML element"""
+    return u'<%s%s>%s</%s>' % (tag, attrs, escape(text), tag)
+
+
+def _to_pubmed_xml(rec):
+    """Aux Function: format the common fields of a record as PubmedArticle
+
+    The output contains the PMID, journal, publication date, pages, title,
+    abstract, authors, MeSH headings and article IDs.
+    """
+    out = [u'<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM">',
+           _xml_element('PMID', rec['PMID'], ' Version="1"'),
+           u'<Article><Journal><JournalIssue>']
+    for key, tag in (('VI', 'Volume'), ('IP', 'Issue')):
+        if key in rec:
+            out.append(_xml_element(tag, rec[key]))
+    out.append(u'<PubDate>%s</PubDate></JournalIssue>' %
+               _xml_element('MedlineDate', rec.get('DP', '')))
+    if 'JT' in rec:
+        out.append(_xml_element('Title', rec['JT']))
+    out.append(u'</Journal>')
+    out.append(_xml_element('ArticleTitle', rec.get('TI', '')))
+    if 'PG' in rec:
+        out.append(u'<Pagination>%s</Pagination>' %
+                   _xml_element('MedlinePgn', rec['PG']))
+    if 'AB' in rec:
+        out.append(u'<Abstract>%s</Abstract>' %
+                   _xml_element('AbstractText', rec['AB']))
+    out.append(u'<AuthorList>')
+    for name in _as_list(rec.get('FAU', [])):
+        last, _, fore = name.partition(', ')
+        out.append(u'<Author ValidYN="Y">%s%s</Author>' % (
+            _xml_element('LastName', last),
+            _xml_element('ForeName', fore) if fore else u''))
+    out.append(u'</AuthorList></Article><MedlineJournalInfo>%s'
+               u'</MedlineJournalInfo><MeshHeadingList>' %
+               _xml_element('MedlineTA', rec.get('TA', '')))
+    for heading in _as_list(rec.get('MH', [])):
+        names = heading.split('/')
+        out.append(u'<MeshHeading>')
+        for ii, name in enumerate(names):
+            major = u' MajorTopicYN="%s"' % ('Y' if '*' in name else 'N')
+            out.append(_xml_element('QualifierName' if ii else
+                                    'DescriptorName', name.lstrip('*'),
+                                    major))
+        out.append(u'</MeshHeading>')
+    out.append(u'</MeshHeadingList></MedlineCitation>'
+               u'<PubmedData><ArticleIdList>')
+    out.append(_xml_element('ArticleId', rec['PMID'], ' IdType="pubmed"'))
+    for aid in _as_list(rec.get('AID', [])):
+        value, _, id_type = aid.rpartition(' [')
+        out.append(_xml_element('ArticleId', value,
+                                ' IdType="%s"' % id_type.rstrip(']')))
+    out.append(u'</ArticleIdList></PubmedData></PubmedArticle>')
+    return u''.join(out)
+
+
+def _matches(rec, words):
+    """Aux Function: whether all search words occur in the record"""
+    for word, field in words:
+        values = [rec.get(field, '')] if field else rec.values()
+        text = u' '.join(u' '.join(_as_list(v)) for v in values).lower()
+        if word not in text:
+            return False
+    return True
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Aux Class: dispatch requests to the FakeEntrezServer"""
+
+    def do_GET(self):
+        self.server.fake._handle(self)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.body = self.rfile.read(length).decode('utf-8')
+        self.server.fake._handle(self)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ForwardHandler(BaseHandler):
+    """Aux Class: send requests for NCBI and doi.org to the local server"""
+    handler_order = 100  # before the default http and https handlers
+
+    def __init__(self, hosts, url):
+        self.hosts = hosts
+        self.url = url
+
+    def _open(self, req):
+        parts = urlsplit(req.get_full_url())
+        if parts.netloc not in self.hosts:
+            return None
+        url = self.url + parts.path + ('?' + parts.query if parts.query
+                                       else '')
+        return self.parent.open(Request(url, data=req.data,
+                                        headers=dict(req.header_items())))
+
+    http_open = https_open = _open
+
+
+class FakeEntrezServer(object):
+    """Serve Entrez and DOI requests from local records
+
+    Used as context manager, requests for eutils.ncbi.nlm.nih.gov and
+    dx.doi.org made through urllib, e.g., by `pymed.query_records`,
+    Bio.Entrez and `pymed.resolve_doi`, are answered by the local server.
+
+    Parameters
+    ----------
+    records : list-like of pymed.PubmedRecord
+        The records that can be searched and fetched.
+    latency : float
+        The delay before each response, in seconds.
+    error_rate : float
+        The fraction of requests answered with HTTP 500 or 503.
+    rate_limit : float | None
+        The number of requests per second above which requests are
+        answered with HTTP 429, as NCBI does. If None, requests are not
+        limited.
+    seed : int
+        The seed of the random number generator drawing errors.
+
+    Attributes
+    ----------
+    url : str
+        The address of the server once started, e.g. 'http://127.0.0.1:80'.
+    n_requests : dict
+        The number of requests per endpoint, e.g. 'efetch' or 'doi'.
+    n_errors : int
+        The number of simulated server errors.
+    n_throttled : int
+        The number of requests answered with HTTP 429.
+    """
+    def __init__(self, records, latency=0., error_rate=0., rate_limit=None,
+                 seed=0):
+        self.records = list(records)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.url = None
+        self.n_requests = {}
+        self.n_errors = 0
+        self.n_throttled = 0
+        self._index = dict((r['PMID'], r) for r in self.records)
+        self._dois = dict((r.get_doi().lower(), r) for r in self.records
+                          if r.get_doi() is not None)
+        self._history = {}
+        self._recent = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._opener = None
+
+    def start(self):
+        """Start serving in a background thread
+
+        Returns
+        -------
+        self : instance of FakeEntrezServer
+        """
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0), _RequestHandler)
+        self._server.fake = self
+        self.url = 'http://127.0.0.1:%i' % self._server.server_address[1]
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        # the opener in place, e.g. of an enclosing server, is restored
+        self._opener = urllib_request._opener
+        install_opener(build_opener(
+            _ForwardHandler((ENTREZ_HOST,) + DOI_HOSTS, self.url)))
+        return self
+
+    def __exit__(self, *args):
+        install_opener(self._opener)
+        self._opener = None
+        self.stop()
+
+    def search(self, term):
+        """Find the PubMed IDs of the records matching a term
+
+        All words must occur in the record. A word may be restricted to a
+        field as in PubMed, e.g. 'kurtosis[TI]'.
+
+        Parameters
+        ----------
+        term : str
+            The search term.
+
+        Returns
+        -------
+        pmids : list of str
+            The PubMed IDs in the order of the records.
+        """
+        words = [(w.lower(), f) for w, f in _TERM_REGEX.findall(term)
+                 if w.upper() != 'AND']
+        return [r['PMID'] for r in self.records if _matches(r, words)]
+
+    def _check_limits(self):
+        """Aux Function: draw a status code for throttling and errors"""
+        with self._lock:
+            now = time.time()
+            self._recent = [t for t in self._recent if now - t < 1.]
+            self._recent.append(now)
+            if (self.rate_limit is not None and
+                    len(self._recent) > self.rate_limit):
+                self.n_throttled += 1
+                return 429
+            if self._rng.random() < self.error_rate:
+                self.n_errors += 1
+                return self._rng.choice([500, 503])
+        return 200
+
+    def _handle(self, handler):
+        """Aux Function: answer a request"""
+        parts = urlsplit(handler.path)
+        params = parse_qs(parts.query)
+        params.update(parse_qs(getattr(handler, 'body', '')))
+        # parameter names are case insensitive, e.g. WebEnv and webenv
+        params = dict((k.lower(), v[0]) for k, v in params.items())
+        if parts.path.startswith('/entrez/eutils/'):
+            endpoint = parts.path.rsplit('/', 1)[-1].split('.')[0]
+        elif parts.path.startswith('/article/'):
+            endpoint = 'article'
+        else:
+            endpoint = 'doi'
+        with self._lock:
+            self.n_requests[endpoint] = self.n_requests.get(endpoint, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        status = self._check_limits()
+        if status != 200:
+            self._send(handler, status, u'Simulated error',
+                       headers={'Retry-After': '1'} if status == 429 else {})
+            return
+        method = getattr(self, '_' + endpoint, None)
+        if method is None:
+            self._send(handler, 404, u'Unknown endpoint %s' % endpoint)
+            return
+        method(handler, params, unquote(parts.path))
+
+    def _send(self, handler, status, body, content_type='text/plain',
+              headers=None):
+        """Aux Function: write a response"""
+        body = body.encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type + '; charset=UTF-8')
+        handler.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def _esearch(self, handler, params, path):
+        """Aux Function: search records, optionally keeping the result"""
+        term = params.get('term', '')
+        pmids = self.search(term)
+        retstart = int(params.get('retstart', 0))
+        retmax = int(params.get('retmax', 20))
+        history = u''
+        if params.get('usehistory') == 'y':
+            with self._lock:
+                webenv = 'WEBENV_%i' % (len(self._history) + 1)
+                self._history[webenv] = pmids
+            history = (u'<QueryKey>1</QueryKey><WebEnv>%s</WebEnv>' %
+                       webenv)
+        ids = pmids[retstart:retstart + retmax]
+        body = ESEARCH_TMP.format(
+            count=len(pmids), retmax=len(ids), retstart=retstart,
+            history=history, term=escape(term),
+            ids=u''.join(u'<Id>%s</Id>' % pmid for pmid in ids))
+        self._send(handler, 200, body, 'text/xml')
+
+    def _efetch(self, handler, params, path):
+        """Aux Function: return records in Medline or XML format"""
+        if 'id' in params:
+            pmids = [p for p in params['id'].split(',') if p]
+        elif params.get('webenv') in self._history:
+            pmids = self._history[params['webenv']]
+            retstart = int(params.get('retstart', 0))
+            pmids = pmids[retstart:retstart + int(params.get('retmax',
+                                                             len(pmids)))]
+        else:
+            self._send(handler, 400, u'Missing id or WebEnv')
+            return
+        recs = [self._index[p] for p in pmids if p in self._index]
+        if params.get('retmode') == 'xml':
+            body = (u'<?xml version="1.0" encoding="UTF-8"?>\n'
+                    u'<PubmedArticleSet>%s</PubmedArticleSet>\n' %
+                    u''.join(_to_pubmed_xml(r) for r in recs))
+            self._send(handler, 200, body, 'text/xml')
+        else:
+            body = u'\n'.join(_to_medline(r) for r in recs)
+            self._send(handler, 200, u'\n' + body)
+
+    def _doi(self, handler, params, path):
+        """Aux Function: redirect a DOI to the article page"""
+        doi = path.lstrip('/')
+        if doi.lower() not in self._dois:
+            self._send(handler, 404, u'DOI not found: %s' % doi)
+            return
+        location = '%s/article/%s' % (self.url, quote(doi))
+        self._send(handler, 302, u'', headers={'Location': location})
+
+    def _article(self, handler, params, path):
+        """Aux Function: the landing page of an article"""
+        rec = self._dois[path[len('/article/'):].lower()]
+        body = u'<html><title>%s</title></html>' % escape(rec.get('TI', ''))
+        self._send(handler, 200, body, 'text/html')
@@ -0,0 +1,29 @@
+import os.path as op
+from nose.tools import assert_true, assert_raises
+
+from ..pymed import read_records, Records, PubmedRecord
+
+base_dir = op.join(op.dirname(__file__))
+recs = read_records(op.join(base_dir, 'test_recs.json'))
+
+
+def test_near_duplicates():
+    """ Test near-duplicate detection """
+    assert_true(recs.near_duplicates() == [])
+
+    # a republished version with a slightly edited abstract
+    dup = PubmedRecord(recs[0])
+    dup['PMID'] = '1'
+    dup['AB'] = dup['AB'].replace('PURPOSE: ', '')
+    # an erratum referencing another record
+    erratum = PubmedRecord({'PMID': '2', 'TI': 'Erratum',
+                            'EFR': ['Foo. 2013. PMID: %s' % recs[1]['PMID']]})
+    recs_ = recs + Records([dup, erratum])
+    assert_true(recs_.near_duplicates() == [[0, 3], [1, 4]])
+    assert_true(recs_.near_duplicates(links=False) == [[0, 3]])
+    assert_raises(ValueError, recs_.near_duplicates, threshold=0)
+
+    # texts shorter than a shingle are not grouped by text
+    errata = Records(PubmedRecord({'PMID': str(ii), 'TI': 'Erratum.'})
+                     for ii in range(100, 300))
+    assert_true((recs_ + errata).near_duplicates(links=False) == [[0, 3]])
@@ -0,0 +1,127 @@
+import io
+import json
+import os.path as op
+from xml.dom import minidom
+from nose.tools import assert_true, assert_raises
+
+from ..pymed import read_records, PubmedRecord
+from ..constants import PMD
+from ..export import (format_bibtex, format_nbib, format_ris, format_csljson,
+                      _bibtex_get_author, BibtexKeyIndex, export_records,
+                      RIS_FIELDS, CSL_FIELDS, ENDNOTE_FIELDS)
+from ..utils import _TempDir
+
+tempdir = _TempDir()
+base_dir = op.join(op.dirname(__file__))
+recs = read_records(op.join(base_dir, 'test_recs.json'))
+
+
+def test_format_records():
+    """ Test formatting of single records """
+    rec = recs[1]
+    bib = format_bibtex(rec)
+    assert_true(bib.startswith('\n@article{lee:2013,'))
+    assert_true('Volume = {%s}' % rec['VI'] in bib)
+    assert_true(format_bibtex(rec, key='foo').startswith('\n@article{foo,'))
+    assert_true(_bibtex_get_author(['Guns PJ', 'Foo']) == 'Guns, P.J and Foo')
+    assert_true(format_bibtex(PubmedRecord({'PMID': '1'})).startswith(
+        '\n@article{na:None,\nAuthor = {NA},'))
+
+    nbib = format_nbib(rec)
+    assert_true(nbib.startswith('\n\nPMID- %s\n' % rec['PMID']))
+    assert_true('\nPG  - 19-26\n' in nbib)
+    # long values are wrapped and indented
+    lines = nbib.split('\n')
+    assert_true(all(len(l) <= 76 for l in lines))
+    assert_true(any(l.startswith(' ' * 6) for l in lines))
+
+
+def test_save_as():
+    """ Test streaming export of records """
+    recs_ = recs.copy()
+    recs_.exclude_.append(1)
+    for method, end in [('save_as_bibtex', '.bib'),
+                        ('save_as_nbib', '.nbib')]:
+        fname = op.join(tempdir, 'foo')
+        getattr(recs_, method)(fname)
+        with io.open(fname + end, encoding='utf-8') as fid:
+            single = fid.read()
+        fname = op.join(tempdir, 'bar' + end)
+        getattr(recs_, method)(fname, n_jobs=2, chunksize=1)
+        with io.open(fname, encoding='utf-8') as fid:
+            parallel = fid.read()
+        assert_true(single == parallel)
+        assert_true(recs[0]['TI'][:30] in single)
+        assert_true(recs[1]['TI'][:30] not in single)
+
+
+def test_bibtex_keys():
+    """ Test unique BibTex keys """
+    recs_ = [PubmedRecord({'PMID': str(pmid), 'AU': ['Smith J'],
+                           'DP': '2013'}) for pmid in range(30, 0, -1)]
+    index = BibtexKeyIndex()
+    keys = [index.get_key(rec) for rec in recs_]
+    assert_true(keys[:3] == ['smith:2013', 'smith:2013a', 'smith:2013b'])
+    assert_true(keys[-4:] == ['smith:2013z', 'smith:2013aa', 'smith:2013ab',
+                              'smith:2013ac'])
+    assert_true(len(set(keys)) == len(keys))
+
+    # deterministic keys do not depend on the order of the records
+    keys = [BibtexKeyIndex(r_).get_key(rec) for r_ in (recs_, recs_[::-1])
+            for rec in r_[:1]]
+    assert_true(keys == ['smith:2013ac', 'smith:2013'])
+    assert_raises(ValueError, BibtexKeyIndex, iter(recs_))
+
+    recs2 = recs.copy()
+    recs2.append(PubmedRecord(recs2[0]))
+    fname = op.join(tempdir, 'keys.bib')
+    for deterministic in (False, True):
+        recs2.save_as_bibtex(fname, deterministic=deterministic)
+        with io.open(fname, encoding='utf-8') as fid:
+            bib = fid.read()
+        assert_true('{vanhoutte:2013,' in bib and '{vanhoutte:2013a,' in bib)
+
+
+def test_export_formats():
+    """ Test RIS, CSL-JSON and EndNote XML export """
+    for fields in (RIS_FIELDS, CSL_FIELDS, ENDNOTE_FIELDS):
+        assert_true(all(tag in PMD for tag, _ in fields))
+
+    rec = recs[2]
+    ris = format_ris(rec).split('\n')
+    assert_true(ris[0] == 'TY  - JOUR' and ris[-2] == 'ER  - ')
+    assert_true('AU  - %s' % rec['FAU'][0] in ris)
+    assert_true(['SP  - 2298', 'EP  - 2301'] == [l for l in ris
+                                                 if l[:2] in ('SP', 'EP')])
+    assert_true('DA  - 2012/08//' in ris)
+    item = json.loads(format_csljson(rec))
+    assert_true(item['issued'] == {'date-parts': [[2012, 8]]})
+    assert_true(item['author'][0] == {'family': 'Li', 'given': 'Xianjun'})
+    assert_true(item['DOI'] == rec.get_doi())
+
+    recs_ = recs.copy()
+    recs_[0]['TI'] = 'Amyloid & <tau>'
+    recs_.exclude_.append(1)
+    for fmt in ('ris', 'csljson', 'endnote'):
+        fname = op.join(tempdir, 'foo')
+        getattr(recs_, 'save_as_' + fmt)(fname)
+        # from an iterator, in chunks
+        fname2 = export_records(iter(recs_[::2]), op.join(tempdir, 'bar'),
+                                fmt, chunksize=1)
+        fname += fname2[-5:] if fmt == 'csljson' else fname2[-4:]
+        with io.open(fname, encoding='utf-8') as fid:
+            out = fid.read()
+        with io.open(fname2, encoding='utf-8') as fid:
+            assert_true(fid.read() == out)
+        if fmt == 'ris':
+            assert_true(out.count('TY  - JOUR') == 2)
+        elif fmt == 'csljson':
+            items = json.loads(out)
+            assert_true([i['PMID'] for i in items] ==
+                        [recs_[0]['PMID'], recs_[2]['PMID']])
+            assert_true(items[0]['title'] == 'Amyloid & <tau>')
+        else:
+            dom = minidom.parse(fname)
+            assert_true(len(dom.getElementsByTagName('record')) == 2)
+            title = dom.getElementsByTagName('title')[0]
+            assert_true(title.firstChild.data == 'Amyloid & <tau>')
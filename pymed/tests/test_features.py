@@ -0,0 +1,72 @@
+import os.path as op
+import numpy as np
+from numpy.testing import assert_array_equal, assert_allclose
+from nose.tools import assert_true, assert_raises
+
+from ..pymed import read_records, Records
+
+base_dir = op.join(op.dirname(__file__))
+recs = read_records(op.join(base_dir, 'test_recs.json'))
+
+
+def test_to_matrix():
+    """ Test document-term matrix export """
+    counts, vocab, pmids = recs.to_matrix(kind='count')
+    assert_true(counts.shape == (len(recs), len(vocab)))
+    assert_true(pmids == [r.pubmed_id for r in recs])
+    ti = recs[0]['TI'].lower()
+    assert_true(counts[0, vocab['diffusion']] == ti.count('diffusion') +
+                recs[0]['AB'].lower().count('diffusion'))
+
+    tfidf, vocab2, _ = recs.to_matrix(kind='tfidf')
+    assert_true(vocab2 == vocab)
+    assert_allclose(np.sqrt(tfidf.multiply(tfidf).sum(axis=1)).A.ravel(), 1.)
+    assert_array_equal(tfidf.indices, counts.indices)
+
+    # fixed and hashed vocabularies, process-parallel tokenization
+    counts2, _, _ = recs.to_matrix(kind='count', vocabulary={'diffusion': 0})
+    assert_true(counts2.shape == (len(recs), 1))
+    assert_array_equal(counts2.toarray()[:, 0],
+                       counts.toarray()[:, vocab['diffusion']])
+    hashed, n_features, _ = recs.to_matrix(kind='count', vocabulary=2 ** 18)
+    assert_true(n_features == hashed.shape[1] == 2 ** 18)
+    assert_array_equal(hashed.sum(axis=1), counts.sum(axis=1))
+    hashed2, _, _ = recs.to_matrix(kind='count', vocabulary=2 ** 18,
+                                   n_jobs=2, chunksize=1)
+    assert_array_equal(hashed2.toarray(), hashed.toarray())
+
+    recs_ = recs.copy()
+    recs_[0]['MH'] = ['Brain/*pathology', '*Brain/physiology', 'Mice']
+    onehot, mesh, _ = recs_.to_matrix(kind='mesh-onehot')
+    assert_true(sorted(mesh) == ['Brain', 'Mice'])
+    assert_array_equal(onehot.toarray(), [[1, 1], [0, 0], [0, 0]])
+    onehot, _, _ = recs_.to_matrix(kind='mesh-onehot', vocabulary=1)
+    assert_array_equal(onehot.toarray(), [[1], [0], [0]])
+    assert_raises(ValueError, recs.to_matrix, kind='foo')
+
+
+def test_cooccurrence():
+    """ Test co-occurrence matrices """
+    recs_ = recs.copy()
+    recs_[0]['MH'] = ['Brain/*pathology', '*Brain/physiology', 'Mice']
+    recs_[1]['MH'] = ['Brain', 'Humans']
+    recs_[1]['AU'] = ['Lee CY', 'Bennett KM.', u'M\xfcller H']
+    recs_[2]['AU'] = ['lee cy', 'Muller H', 'Smith J']
+    mesh, vocab = recs_.cooccurrence('MH')
+    assert_true(vocab == {'Brain': 0, 'Mice': 1, 'Humans': 2})
+    assert_array_equal(mesh.toarray(), [[2, 1, 1], [1, 1, 0], [1, 0, 1]])
+    raw, vocab_raw = recs_.cooccurrence('MH', normalize=False)
+    assert_true(len(vocab_raw) == 5 and raw.diagonal().sum() == 5)
+
+    authors, vocab = recs_.cooccurrence('AU', n_jobs=2, chunksize=1)
+    lee, muller = vocab['lee cy'], vocab['muller h']
+    assert_true(authors[lee, muller] == authors[muller, lee] == 2)
+    assert_true(authors[lee, vocab['bennett km']] == 1)
+    assert_true((authors != authors.T).nnz == 0)
+
+    # reuse of the vocabulary
+    authors2, vocab2 = Records(recs_[1:]).cooccurrence('AU', vocabulary=vocab)
+    assert_true(vocab2 is vocab and authors2.shape == authors.shape)
+    assert_true(authors2[lee, lee] == 2 and authors2[lee, muller] == 2)
+    mesh, vocab = Records(recs_[2:]).cooccurrence('MH')
+    assert_true(mesh.shape == (0, 0) and vocab == {})
@@ -0,0 +1,41 @@
+import os.path as op
+import numpy as np
+from numpy.testing import assert_array_equal
+from nose.tools import assert_true, assert_raises
+
+from ..pymed import read_records, Records, PubmedRecord
+from ..links import get_linked_pmids
+
+base_dir = op.join(op.dirname(__file__))
+recs = read_records(op.join(base_dir, 'test_recs.json'))
+
+
+def test_link_graph():
+    """ Test graph of linked records """
+    recs_ = recs + Records([
+        PubmedRecord({'PMID': '10', 'ROF': ['Foo. 2012. PMID: 20'],
+                      'CON': ['Bar. 2011. PMID: 30', 'Baz. 2011']}),
+        PubmedRecord({'PMID': '20', 'UIN': ['Foo. 2013. PMID: 40']}),
+        PubmedRecord({'PMID': '50', 'CIN': ['Foo. 2014. PMID: 20']}),
+        PubmedRecord({'TI': 'No PubMed ID', 'CIN': ['Foo. PMID: 20']})])
+    assert_true(get_linked_pmids(recs_[3]) == [('CON', '30'),
+                                               ('ROF', '20')])
+
+    graph = recs_.link_graph()
+    assert_true(graph.n_nodes == len(recs_) + 1)
+    assert_true(graph.n_edges == 4)
+    assert_true(graph.in_corpus.sum() == len(recs_) - 1)
+    assert_array_equal(graph.neighbors('10'), [20, 30])
+    assert_array_equal(graph.neighbors(10, tags=['ROF']), [20])
+    assert_array_equal(graph.neighbors(20, direction='in'), [10, 50])
+    assert_array_equal(graph.neighbors(20, direction='both'), [10, 40, 50])
+    assert_raises(KeyError, graph.neighbors, 1)
+    assert_raises(ValueError, graph.neighbors, 10, tags=['AU'])
+
+    assert_array_equal(graph.pmids[graph.retracted], [20])
+    assert_array_equal(graph.pmids[graph.superseded], [20])
+    n_components, labels = graph.connected_components()
+    assert_true(n_components == len(recs) + 1)
+    assert_true(len(np.unique(labels[np.searchsorted(
+        graph.pmids, [10, 20, 30, 40, 50])])) == 1)
+    assert_true('%s' % graph == '<LinkGraph | 8 nodes (6 records), 4 edges>')
@@ -0,0 +1,76 @@
+import logging
+import os.path as op
+from nose.tools import assert_true, assert_raises
+
+try:
+    from urllib.error import HTTPError
+except ImportError:
+    from urllib2 import HTTPError
+
+from ..metrics import QueryMetrics, logger
+from ..pymed import read_records, query_records
+from ..testing import FakeEntrezServer
+
+base_dir = op.join(op.dirname(__file__))
+recs = read_records(op.join(base_dir, 'test_recs.json'))
+
+
+def test_query_metrics():
+    """ Test instrumentation of query_records """
+    from Bio import Entrez
+    events = []
+    metrics = QueryMetrics()
+    with FakeEntrezServer(recs, error_rate=0.3, seed=1) as server:
+        query_records('kurtosis', 'foo@bar.com', chunksize=2,
+                      sleep_between_tries=0,
+                      callback=[metrics, lambda e, **kw: events.append(e)])
+    assert_true(Entrez.max_tries == 3)  # Biopython settings are untouched
+    assert_true(metrics.n_records == 3)
+    assert_true(metrics.phase_calls['esearch'] == 1)
+    assert_true(metrics.phase_calls['efetch'] == 2)
+    assert_true(metrics.phase_calls['parse'] == 2)
+    assert_true(sum(metrics.n_retries.values()) == server.n_errors > 0)
+    assert_true(sum(server.n_requests.values()) ==
+                sum(metrics.phase_calls[p] for p in ('esearch', 'efetch')) +
+                server.n_errors)
+    assert_true(metrics.n_bytes > 1000)
+    assert_true(metrics.records_per_second > 0)
+    assert_true(events[-1] == 'done' and 'retry' in events)
+    # back-to-back requests are spaced for the NCBI rate limit
+    assert_true('throttle' in events and metrics.throttle_seconds > 0)
+    text = metrics.to_prometheus()
+    assert_true('pymed_query_records_total 3\n' in text)
+    assert_true('pymed_query_phase_calls_total{phase="efetch"} 2\n' in text)
+    assert_true('pymed_query_throttle_seconds_total %r\n'
+                % metrics.throttle_seconds in text)
+
+    # the delay requested with HTTP 429 is honored
+    metrics = QueryMetrics()
+    with FakeEntrezServer(recs, rate_limit=1) as server:
+        query_records('kurtosis', 'foo@bar.com', callback=metrics)
+    assert_true(server.n_throttled > 0)
+    assert_true(metrics.wait_seconds == server.n_throttled)
+
+    # debug logging
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    try:
+        with FakeEntrezServer(recs):
+            query_records('kurtosis', 'foo@bar.com')
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+    assert_true(any(r.getMessage().startswith('phase duration=')
+                    for r in records))
+    # progress messages are logged at info level
+    assert_true([r.getMessage() for r in records
+                 if r.levelno == logging.INFO][-1] == 'Ready.')
+
+    # failures after the last attempt are raised
+    with FakeEntrezServer(recs, error_rate=1.) as server:
+        assert_raises(HTTPError, query_records, 'kurtosis', 'foo@bar.com',
+                      max_tries=2, sleep_between_tries=0, callback=metrics)
+        assert_true(server.n_requests == {'esearch': 2})
@@ -0,0 +1,44 @@
+import os.path as op
+from nose.tools import assert_true, assert_raises
+
+import numpy as np
+
+from ..pymed import read_records, Records, PubmedRecord
+
+base_dir = op.join(op.dirname(__file__))
+recs = read_records(op.join(base_dir, 'test_recs.json'))
+
+
+def _n_authors(rec):
+    return len(rec.get('AU', []))
+
+
+def _is_imaging(rec):
+    return 'imaging' in rec.get('TI', '').lower()
+
+
+def _title_only(rec):
+    return PubmedRecord({'PMID': rec['PMID'], 'TI': rec.get('TI', '')})
+
+
+def test_parallel_map_filter():
+    """ Test parallel map and filter over records """
+    expected = [_n_authors(r) for r in recs]
+    for n_jobs in (1, 2):
+        assert_true(recs.parallel_map(_n_authors, n_jobs=n_jobs,
+                                      chunksize=3) == expected)
+        out = recs.parallel_map(_n_authors, n_jobs=n_jobs, chunksize=3,
+                                dtype=np.int64)
+        assert_true(out.dtype == np.int64)
+        assert_true(np.array_equal(out, expected))
+        out = recs.parallel_map(_title_only, n_jobs=n_jobs, chunksize=3)
+        assert_true(isinstance(out, Records) and len(out) == len(recs))
+        assert_true([r.pubmed_id for r in out] ==
+                    [r.pubmed_id for r in recs])
+        out = recs.parallel_filter(_is_imaging, n_jobs=n_jobs, chunksize=3)
+        assert_true(isinstance(out, Records))
+        assert_true(out == [recs[0], recs[2]])
+    assert_true(recs.parallel_map(_n_authors, chunksize=len(recs) + 1) ==
+                expected)
+    assert_true(Records().parallel_filter(_is_imaging) == [])
+    assert_raises(ValueError, recs.parallel_map, _n_authors, chunksize=0)
@@ -0,0 +1,82 @@
+import os.path as op
+import threading
+from nose.tools import assert_true, assert_raises
+
+import pymed
+from .. import export  # noqa, imports are slow while tracing memory
+from ..pymed import Records, read_records
+from ..profiling import tracemalloc
+from ..utils import _TempDir
+
+tempdir = _TempDir()
+base_dir = op.join(op.dirname(__file__))
+fname = op.join(base_dir, 'test_recs.json')
+
+
+def test_profile():
+    """ Test profiling Records operations """
+    find = Records.__dict__['find']
+    with pymed.profile() as prof:
+        recs = pymed.read_records(fname)
+        recs.find('kurtosis').save_as_nbib(op.join(tempdir, 'recs'))
+        recs.copy().save(op.join(tempdir, 'recs.json'))
+        assert_raises(RuntimeError, pymed.profile().__enter__)
+    assert_true(Records.__dict__['find'] is find)
+    assert_true(pymed.read_records is read_records)
+
+    stats = prof.stats
+    assert_true(stats['read_records'].calls == 1)
+    assert_true(stats['Records.find'].calls == 1)
+    assert_true(stats['PubmedRecord.match'].calls == len(recs))
+    assert_true(stats['write_records'].calls == 1)
+    find = stats['Records.find']
+    assert_true(find.cumtime >= find.tottime > 0)
+    assert_true(('read_records', 'Records.extend') in prof.stacks)
+    # the generator of find is consumed by extend
+    assert_true(('Records.find', 'Records.extend', 'PubmedRecord.match')
+                in prof.stacks)
+    assert_true(find.tottime == prof.stacks[('Records.find',)])
+
+    report = prof.report(sort='calls').splitlines()
+    assert_true(report[1].startswith('PubmedRecord.as_corpus'))  # tie
+    assert_true(len(prof.report(n_max=2).splitlines()) <=
+                3 + 2 + len(prof.allocations))
+    assert_raises(ValueError, prof.report, sort='foo')
+    assert_true(bool(prof.allocations) == (tracemalloc is not None))
+    if tracemalloc is not None:  # the records read are still allocated
+        assert_true(stats['read_records'].blocks >= len(recs))
+        assert_true(stats['read_records'].memory > 0)
+
+    folded = op.join(tempdir, 'recs.folded')
+    prof.save_folded(folded)
+    lines = open(folded).read().splitlines()
+    assert_true('Records.find;Records.extend;PubmedRecord.match' in
+                [l.rsplit(' ', 1)[0] for l in lines])
+    assert_true(all(l.rsplit(' ', 1)[1].isdigit() for l in lines))
+
+    # calls from several threads are aggregated
+    recs = read_records(fname)
+    with pymed.profile(trace_memory=False) as prof:
+        threads = [threading.Thread(target=lambda: [
+            rec.match('kurtosis') for _ in range(200) for rec in recs])
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert_true(prof.stats['PubmedRecord.match'].calls ==
+                4 * 200 * len(recs))
+
+    # blocks allocated by other threads are not charged to methods
+    if tracemalloc is None:
+        return
+    allocated = []
+    with pymed.profile() as prof:
+        thread = threading.Thread(target=lambda: allocated.extend(
+            [object() for _ in range(20000)]))
+        thread.start()
+        for _ in range(200):
+            for rec in recs:
+                rec.match('kurtosis')
+        thread.join()
+    assert_true(prof.stats['PubmedRecord.match'].blocks < 1000)
@@ -0,0 +1,65 @@
+import gzip
+import shutil
+import os.path as op
+from nose.tools import assert_true
+
+from ..pubmed_xml import read_pubmed_xml, iter_pubmed_xml
+from ..pymed import PubmedRecord, Records
+from ..utils import _TempDir
+
+tempdir = _TempDir()
+base_dir = op.join(op.dirname(__file__))
+fname = op.join(base_dir, 'test_recs.xml')
+
+
+def test_read_pubmed_xml():
+    """ Test reading PubMed XML """
+    recs = read_pubmed_xml(fname)
+    assert_true(isinstance(recs, Records))
+    assert_true([r.pubmed_id for r in recs] == ['23428968', '23494926'])
+    rec = recs[0]
+    assert_true(rec['FAU'] == ['Lee, Chu-Yu', 'Bennett, Kevin M'])
+    assert_true(rec['AU'] == ['Lee CY', 'Bennett KM'])
+    assert_true(rec['CN'] == ['DKI Study Group'])
+    assert_true(rec['MH'] == ['Brain/*pathology', '*Computer Simulation'])
+    assert_true(rec['AB'].startswith('PURPOSE: The aim of this study was to '
+                                     'investigate the microstructural'))
+    assert_true(rec['IS'] == '1096-0856 (Electronic) 1090-7807 (Linking)')
+    assert_true(rec['SO'] == 'J Magn Reson. 2013 May;230:19-26.')
+    assert_true(rec['UIN'] == ['J Magn Reson. 2014;240:5-6. PMID: 24567890'])
+    assert_true(rec.pub_date == (2013, 5, None, 'month'))
+    assert_true(rec.entrez_date == (2013, 2, 23, 'day'))
+    assert_true(rec.epub_date == (2013, 2, 6, 'day'))
+    assert_true(rec.get_doi() == '10.1016/j.jmr.2013.01.014')
+    assert_true(recs[1]['DP'] == '2013 Mar-Apr' and recs[1].year == 2013)
+
+    # gzipped files, streamed or read in parallel
+    fname_gz = op.join(tempdir, 'test_recs.xml.gz')
+    with open(fname, 'rb') as fid_in:
+        with gzip.open(fname_gz, 'wb') as fid_out:
+            shutil.copyfileobj(fid_in, fid_out)
+    stream = iter_pubmed_xml([fname_gz, fname])
+    assert_true(isinstance(next(stream), PubmedRecord))
+    assert_true(len(list(stream)) == 3)
+    recs2 = read_pubmed_xml([fname_gz, fname], n_jobs=2)
+    assert_true(recs2 == recs)
+
+    # update files revise and delete citations
+    with open(fname, 'rb') as fid:
+        text = fid.read().decode('utf-8')
+    article = text[text.index('<PubmedArticle>'):
+                   text.index('</PubmedArticle>') + len('</PubmedArticle>')]
+    article = article.replace('Monte Carlo', 'Revised')
+    update = (u'<PubmedArticleSet>%s<DeleteCitation>'
+              u'<PMID Version="1">23494926</PMID></DeleteCitation>'
+              u'</PubmedArticleSet>' % article)
+    fname_update = op.join(tempdir, 'test_update.xml')
+    with open(fname_update, 'wb') as fid:
+        fid.write(update.encode('utf-8'))
+    items = list(iter_pubmed_xml(fname_update, deletions=True))
+    assert_true(items[1:] == ['23494926'])
+    assert_true(len(list(iter_pubmed_xml(fname_update))) == 1)
+    for n_jobs in (1, 2):
+        recs2 = read_pubmed_xml([fname, fname_update], n_jobs=n_jobs)
+        assert_true([r.pubmed_id for r in recs2] == ['23428968'])
+        assert_true('Revised' in recs2[0]['TI'])
@@ -1,7 +1,11 @@
+import copy
 import os.path as op
+import subprocess
+import sys
 from nose.tools import assert_raises, assert_true
 from ..pymed import PubmedRecord, Records, read_records,\
-                    write_records, resolve_doi, query_records
+                    write_records, resolve_doi, query_records, normalize_doi
+from ..testing import FakeEntrezServer
 from ..utils import _TempDir
 
 tempdir = _TempDir()
@@ -18,11 +22,37 @@ def test_read_write_records():
 
 
 def test_resolve_doi():
-    pass
+    """ Test resolving DOIs """
+    with FakeEntrezServer(recs) as server:
+        url = resolve_doi(recs[0])
+        assert_true(url == server.url + '/article/10.1002/mrm.24680')
+        assert_true(recs[1].resolve_doi().startswith(server.url))
+        rec = PubmedRecord({'PMID': '1', 'AID': ['10.1000/missing [doi]']})
+        assert_true(rec.resolve_doi().endswith('/10.1000/missing'))
+        assert_true(server.n_requests == {'doi': 3, 'article': 2})
+    assert_true(resolve_doi(PubmedRecord({'PMID': '1'})) is None)
 
 
 def test_query_records():
-    pass
+    """ Test querying records """
+    with FakeEntrezServer(recs) as server:
+        recs2 = query_records('kurtosis', 'foo@bar.com', chunksize=2)
+        assert_true(len(recs2) == 3)
+        assert_true([r['PMID'] for r in recs2] == [r['PMID'] for r in recs])
+        assert_true(recs2[1]['FAU'] == recs[1]['FAU'])
+        assert_true(server.n_requests == {'esearch': 1, 'efetch': 2})
+        recs2 = query_records('kurtosis[TI] mouse', 'foo@bar.com',
+                              pubmed_fields=['PMID', 'TI'])
+        assert_true(len(recs2) == 1)
+        assert_true(sorted(recs2[0]) == ['PMID', 'TI'])
+        recs2 = query_records('nothing', 'foo@bar.com')
+        assert_true(len(recs2) == 0)
+
+    # server errors are retried
+    with FakeEntrezServer(recs, error_rate=0.3, seed=1) as server:
+        recs2 = query_records('kurtosis', 'foo@bar.com', chunksize=1,
+                              sleep_between_tries=0)
+        assert_true(len(recs2) == 3 and server.n_errors > 0)
 
 
 def test_index_filter_records():
@@ -39,7 +69,8 @@ def test_records_copy():
 def test_records_selection():
     """ Test indexing and seleciton operation """
     # test slicing
-    recs1 = Records(recs[:2])
+    recs1 = recs[:2]
+    assert_true(isinstance(recs1, Records) and isinstance(recs[0:], Records))
 
     # test repr
     for r_ in [recs, recs1]:
@@ -85,5 +116,134 @@ def test_records_selection():
     assert_true(found[0].match(mystring))
 
 
+def test_records_describe():
+    """ Test running summary of records """
+    recs_ = recs.copy()
+    years = [r.year for r in recs_]
+    assert_true(repr(recs_).endswith('| %i - %i>' % (min(years),
+                                                      max(years))))
+    desc = recs_.describe()
+    assert_true(desc['n_records'] == len(recs_))
+    assert_true(desc['year_range'] == (min(years), max(years)))
+    assert_true(desc['field_coverage']['PMID'] == 1.)
+    assert_true(sum(n for _, n in desc['top_journals']) == len(recs_))
+
+    # summary follows mutations
+    rec = recs_.pop(0)
+    recs_.exclude_.append(0)
+    recs_.drop()
+    desc = recs_.describe()
+    assert_true(desc['n_records'] == len(recs_) == 1)
+    assert_true(desc['year_range'] == (recs_[0].year,) * 2)
+    recs_[0] = rec
+    assert_true(recs_.describe()['year_range'] == (rec.year,) * 2)
+    del recs_[0]
+    assert_true(recs_.describe()['year_range'] is None)
+    assert_true(repr(recs_) == '<Records | 0 entries>')
+    assert_raises(TypeError, recs_.__setitem__, 0, 'foo')
+
+    # records edited in place are summarized again
+    recs_ = recs.copy()
+    rec = recs_[0]
+    rec['XX'] = 'new field'
+    assert_true(recs_.describe()['field_coverage']['XX'] == 1. / len(recs_))
+    del rec['XX']
+    rec['JT'] = 'Edited journal'
+    rec['XX'] = 'new field'
+    del rec['DP']
+    recs_.remove(rec)
+    desc = recs_.describe()
+    assert_true(desc['n_records'] == len(recs_))
+    assert_true(desc['year_range'] == (min(years[1:]), max(years[1:])))
+    assert_true('XX' not in desc['field_coverage'])
+    assert_true(sum(n for _, n in desc['top_journals']) == len(recs_))
+    recs_.clear()
+    assert_true(recs_.describe()['n_records'] == 0)
+    assert_true(recs_.describe()['field_coverage'] == {})
+    assert_true(repr(recs_) == '<Records | 0 entries>')
+
+
+def test_record_dates():
+    """ Test parsing of dates """
+    rec = PubmedRecord({'PMID': '1', 'DP': '2011 Nov-Dec',
+                        'EDAT': '2013/03/16 06:00', 'DA': '20130315'})
+    assert_true(rec.year == 2011)
+    assert_true(rec.pub_date == (2011, 11, None, 'month'))
+    assert_true(rec.entrez_date == (2013, 3, 16, 'day'))
+    assert_true(rec.create_date == rec.get_date('DA') == (2013, 3, 15, 'day'))
+    assert_true(rec.epub_date is None)
+    assert_raises(ValueError, rec.get_date, 'TI')
+    rec['DP'] = '2012 Spring'
+    assert_true(rec.pub_date == (2012, None, None, 'year'))
+    rec['DP'] = '2013 Feb 30'
+    assert_true(rec.pub_date == (2013, 2, None, 'month'))
+    del rec['DP']
+    assert_true(rec.year is None)
+
+    # copies and all dict methods keep the parsed dates in sync
+    rec['DP'] = '2011 Nov'
+    rec2 = copy.copy(rec)
+    rec2['DP'] = '1999'
+    assert_true(rec.year == 2011 and rec2.year == 1999)
+    rec2.setdefault('DEP', '20130311')
+    assert_true(rec2.epub_date == (2013, 3, 11, 'day'))
+    rec2 |= {'DP': '2001'}
+    assert_true(rec2.year == 2001)
+    while 'DP' in rec2:
+        rec2.popitem()
+    assert_true(rec2.year is None)
+    rec.clear()
+    assert_true(rec.year is None and rec.entrez_date is None)
+    rec.update(PMID='1')
+
+    dates = Records([rec] + recs.tolist()).dates()
+    assert_true(str(dates.dtype) == 'datetime64[D]')
+    assert_true(str(dates[0]) == 'NaT')
+    assert_true([d.astype(object).year for d in dates[1:]] ==
+                [r.year for r in recs])
+    assert_true(str(recs.dates('DEP')[0]) == '2013-03-11')
+
+
+def test_record_dois():
+    """ Test DOI extraction and normalization """
+    assert_true(recs[1].get_doi() == '10.1016/j.jmr.2013.01.014')
+    assert_true(normalize_doi('https://dx.doi.org/10.1002/MRM.24680.') ==
+                '10.1002/mrm.24680')
+    assert_true(normalize_doi('doi: 10.1002/mrm.24680') ==
+                '10.1002/mrm.24680')
+
+    rec = PubmedRecord(recs[2])
+    assert_true(rec.get_doi() == '10.1109/EMBC.2012.6346422')
+    rec['AID'] = ['S0000-0000(12)00000-0 [pii]', '10.1000/AID.1 [doi]']
+    assert_true(rec.get_doi() == '10.1000/AID.1')
+    del rec['AID']
+    assert_true(rec.get_doi() == '10.1109/EMBC.2012.6346422')  # LID
+    rec.pop('LID')
+    rec['SO'] = 'J Foo. 2012 Aug;1:1-2. doi: 10.1000/so.1. Epub 2012 Jul 1.'
+    assert_true(rec.get_doi() == '10.1000/so.1')
+    del rec['SO']
+    assert_true(rec.get_doi() is None)
+
+    dois = Records([rec] + recs.tolist()).dois()
+    assert_true(dois.dtype == object and dois[0] is None)
+    assert_true(dois[3] == '10.1109/embc.2012.6346422')
+    assert_true(recs.dois(normalize=False)[2] == '10.1109/EMBC.2012.6346422')
+    index = Records([rec] + recs.tolist()).doi_index()
+    assert_true(sorted(index) == sorted(r['PMID'] for r in recs))
+    assert_true(index[recs[0]['PMID']] == '10.1002/mrm.24680')
+
+
 def test_pubmed_record():
     pass
+
+
+def test_lazy_imports():
+    """ Test that reading records does not import Biopython or numpy """
+    code = ('import sys, pymed; '
+            'recs = pymed.read_records(%r); '
+            'repr(recs); recs.describe(); recs.find("kurtosis"); '
+            'print(" ".join(m for m in ("Bio", "numpy", "scipy", '
+            '"multiprocessing") if m in sys.modules))'
+            % op.join(base_dir, 'test_recs.json'))
+    out = subprocess.check_output([sys.executable, '-c', code])
+    assert_true(out.decode().strip() == '')
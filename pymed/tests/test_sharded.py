@@ -0,0 +1,105 @@
+import os.path as op
+from nose.tools import assert_true, assert_raises
+
+from ..pymed import read_records, PubmedRecord, Records
+from ..pubmed_xml import read_pubmed_xml
+from ..sharded import (ShardedRecords, partition_records, read_sharded,
+                       _summarize_shard)
+from ..utils import _TempDir
+
+tempdir = _TempDir()
+base_dir = op.join(op.dirname(__file__))
+recs = read_records(op.join(base_dir, 'test_recs.json'))
+
+
+def _is_imaging(rec):
+    return 'imaging' in rec.get('TI', '').lower()
+
+
+def _pmids(records):
+    return sorted(rec['PMID'] for rec in records)
+
+
+class _SerialExecutor(object):
+    """Executor running tasks in the calling process"""
+    def __init__(self):
+        self.n_tasks = 0
+
+    def map(self, func, iterable):
+        for args in iterable:
+            self.n_tasks += 1
+            yield func(args)
+
+
+def test_sharded_records():
+    """ Test map-reduce over sharded records """
+    assert_raises(ValueError, recs.save_sharded, tempdir, by='month')
+    for by in ('pmid', 'year'):
+        dirname = op.join(tempdir, by)
+        sharded = recs.save_sharded(dirname, by=by, n_shards=3)
+        assert_true(len(sharded) == len(recs))
+        assert_true(len(sharded.fnames) == len(sharded.keys))
+        assert_true(_pmids(sharded.to_records()) == _pmids(recs))
+        for n_jobs in (1, 2):
+            sharded = read_sharded(dirname, n_jobs=n_jobs)
+            found = sharded.find('kurtosis')
+            assert_true(isinstance(found, Records))
+            assert_true(_pmids(found) == _pmids(recs.find('kurtosis')))
+            out = sharded.filter(_is_imaging)
+            assert_true(_pmids(out) == _pmids(r for r in recs
+                                              if _is_imaging(r)))
+            summary = sharded.describe()
+            expected = recs.describe()
+            assert_true(summary['n_records'] == expected['n_records'])
+            assert_true(summary['year_range'] == expected['year_range'])
+            assert_true(summary['field_coverage'] ==
+                        expected['field_coverage'])
+            assert_true(sharded.map(len, reducer=lambda a, b: a + b) ==
+                        len(recs))
+
+    recs_ = recs.copy()
+    recs_.exclude_.append(1)
+    sharded = recs_.save_sharded(op.join(tempdir, 'exclude'), n_shards=2)
+    assert_true(_pmids(sharded) == _pmids([recs[0], recs[2]]))
+
+    # records without PubMed ID or date go to the 'unknown' shard
+    recs_ = recs + Records([PubmedRecord({'TI': 'No PMID'})])
+    for by in ('pmid', 'year'):
+        sharded = recs_.save_sharded(op.join(tempdir, 'unknown-' + by),
+                                     by=by, n_shards=2)
+        assert_true(sharded.keys[-1] == 'unknown')
+        assert_true(len(sharded) == len(recs_))
+
+    # shards send back their counters only, summarizing in-place edits
+    recs_ = recs.copy()
+    recs_[0]['XX'] = 'new field'
+    counts = _summarize_shard(recs_)
+    assert_true(len(counts) == 4 and counts[0] == len(recs_))
+    assert_true(counts[2]['XX'] == 1)
+    del recs_[0]['XX']
+
+    sharded = read_sharded(op.join(tempdir, 'year'))
+    for key, fname in zip(sharded.keys, sharded.fnames):
+        assert_true(all(rec.year == key for rec in read_records(fname)))
+
+    # any object with a map method distributes the shards
+    executor = _SerialExecutor()
+    sharded = read_sharded(op.join(tempdir, 'pmid'), executor=executor)
+    assert_true(_pmids(sharded.find('kurtosis')) ==
+                _pmids(recs.find('kurtosis')))
+    assert_true(executor.n_tasks == len(sharded.fnames))
+    fnames = sharded.export(op.join(tempdir, 'nbib'), fmt='nbib')
+    assert_true(len(fnames) == len(sharded.fnames))
+    assert_true(all(op.isfile(fname) for fname in fnames))
+
+
+def test_sharded_xml():
+    """ Test sharded records read from PubMed XML """
+    fname = op.join(base_dir, 'test_recs.xml')
+    sharded = ShardedRecords([fname, fname])
+    assert_true(len(sharded) == 2 * len(read_pubmed_xml(fname)))
+    assert_true(len(list(sharded)) == len(sharded))
+    assert_true('2 shards' in repr(sharded))
+    sharded = partition_records(iter(sharded), op.join(tempdir, 'xml'),
+                                n_shards=2)
+    assert_true(len(sharded) == 2 * len(read_pubmed_xml(fname)))
@@ -0,0 +1,80 @@
+import os.path as op
+from nose.tools import assert_true, assert_raises
+
+try:
+    from urllib.request import urlopen, build_opener, install_opener
+    from urllib.error import HTTPError
+    import urllib.request as urllib_request
+except ImportError:
+    from urllib2 import urlopen, build_opener, install_opener, HTTPError
+    import urllib2 as urllib_request
+
+from ..pymed import read_records
+from ..pubmed_xml import read_pubmed_xml
+from ..testing import FakeEntrezServer
+from ..utils import _TempDir
+
+tempdir = _TempDir()
+base_dir = op.join(op.dirname(__file__))
+recs = read_records(op.join(base_dir, 'test_recs.json'))
+
+
+def test_fake_entrez_server():
+    """ Test the local Entrez server """
+    from Bio import Entrez, Medline
+    with FakeEntrezServer(recs) as server:
+        assert_true(server.search('kurtosis[TI] AND children') ==
+                    [recs[2]['PMID']])
+        hit = Entrez.read(Entrez.esearch(db='pubmed', term='kurtosis',
+                                         retmax=1, usehistory='y'))
+        assert_true(hit['Count'] == '3' and len(hit['IdList']) == 1)
+        handle = Entrez.efetch(db='pubmed', rettype='medline',
+                               retmode='text', webenv=hit['WebEnv'],
+                               query_key=hit['QueryKey'], retstart=1)
+        fetched = list(Medline.parse(handle))
+        assert_true([r['PMID'] for r in fetched] ==
+                    [r['PMID'] for r in recs[1:]])
+
+        handle = Entrez.efetch(db='pubmed', id=recs[1]['PMID'],
+                               retmode='xml')
+        fname = op.join(tempdir, 'recs.xml')
+        data = handle.read()
+        with open(fname, 'wb') as fid:
+            fid.write(data if isinstance(data, bytes) else
+                      data.encode('utf-8'))
+        rec = read_pubmed_xml(fname)[0]
+        for key in ('PMID', 'TI', 'FAU', 'MH', 'DP', 'JT', 'TA', 'PG'):
+            assert_true(rec.get(key) == recs[1].get(key))
+        assert_true(rec.get_doi() == recs[1].get_doi())
+
+        # EGQuery is retired, as at NCBI
+        with assert_raises(HTTPError) as cm:
+            urlopen(server.url + '/entrez/eutils/egquery.fcgi?term=kurtosis')
+        assert_true(cm.exception.code == 404)
+        assert_true(server.n_requests == {'esearch': 1, 'efetch': 2,
+                                          'egquery': 1})
+
+    with FakeEntrezServer(recs, rate_limit=2, latency=0.01) as server:
+        url = server.url + '/entrez/eutils/esearch.fcgi?term=kurtosis'
+        for _ in range(2):
+            urlopen(url).read()
+        with assert_raises(HTTPError) as cm:
+            urlopen(url)
+        assert_true(cm.exception.code == 429)
+        assert_true(server.n_throttled == 1)
+        assert_true(server.n_requests == {'esearch': 3})
+
+    # the opener installed before is restored, also for nested servers
+    opener = build_opener()
+    install_opener(opener)
+    try:
+        with FakeEntrezServer(recs):
+            with FakeEntrezServer(recs) as server:
+                inner = urllib_request._opener
+            assert_true(urllib_request._opener not in (opener, inner))
+            assert_true(server.url not in [h.url for h in
+                                           urllib_request._opener.handlers
+                                           if hasattr(h, 'url')])
+        assert_true(urllib_request._opener is opener)
+    finally:
+        install_opener(None)
@@ -8,6 +8,11 @@ import tempfile
 import atexit
 from shutil import rmtree
 
+try:
+    from itertools import imap
+except ImportError:
+    imap = map
+
 
 class _TempDir(str):
     """Class for creating and auto-destroying temp dir
@@ -34,5 +39,38 @@ class _TempDir(str):
     def cleanup(self):
         if self._del_after is True:
             if self._print_del is True:
-                print 'Deleting %s ...' % self._path
+                print('Deleting %s ...' % self._path)
             rmtree(self._path, ignore_errors=True)
+
+
+def _get_n_jobs(n_jobs):
+    """Aux Function: resolve the number of worker processes"""
+    import multiprocessing
+    if n_jobs is None or n_jobs == 0:
+        n_jobs = 1
+    elif n_jobs < 0:
+        n_jobs = max(multiprocessing.cpu_count() + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def _parallel_imap(func, iterable, n_jobs=1, chunksize=1):
+    """Aux Function: lazily map func over iterable, preserving order
+
+    If n_jobs > 1 the items are processed by a pool of worker processes,
+    hence func and the items must be picklable. Negative values of n_jobs
+    count backwards from the number of CPUs (-1 uses all of them).
+    """
+    n_jobs = _get_n_jobs(n_jobs)
+    if n_jobs == 1:
+        for out in imap(func, iterable):
+            yield out
+        return
+    import multiprocessing
+    pool = multiprocessing.Pool(n_jobs)
+    try:
+        for out in pool.imap(func, iterable, chunksize):
+            yield out
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()